@@ -1,4 +1,10 @@
+import asyncio
+import hmac
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from typing import Optional
@@ -6,10 +12,12 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
+import crud_async
 from models import User as DBUser
-from schemas import TokenData
+from schemas import AuthenticatedUser, TokenData
 
 load_dotenv()
 
@@ -21,10 +29,81 @@ if not SECRET_KEY:
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 1024))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# The /metrics endpoints are disabled unless METRICS_TOKEN is set, and then
+# take it as their bearer token instead of a user login.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# min/max pin the cost so hashes made with a different BCRYPT_ROUNDS are
+# reported by needs_update() and transparently rehashed on the next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+password_executor = (
+    ThreadPoolExecutor(
+        max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+    )
+    if PASSWORD_HASH_WORKERS > 0
+    else None
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+class UserCache:
+    """Size-bounded LRU of authenticated identities with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return identity
+
+    def set(self, username: str, identity: AuthenticatedUser) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl_seconds, identity)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_cached_user(username: str) -> None:
+    user_cache.invalidate(username)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -35,6 +114,26 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_work(func, *args):
+    if password_executor is None:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, func, *args)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_work(pwd_context.hash, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Verifies off the event loop; also returns a new hash if the cost changed."""
+    return await _run_password_work(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -46,23 +145,68 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> DBUser:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
+            raise _credentials_exception()
+        return TokenData(username=username)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+
+
+async def _load_user(
+    token_data: TokenData, db: Session, async_db: AsyncSession | None
+) -> DBUser:
+    if async_db is not None:
+        user = await crud_async.get_user_by_username(async_db, token_data.username)
+        if user is None:
+            raise _credentials_exception()
+        return db.merge(user, load=False)
     user = db.query(DBUser).filter(DBUser.username == token_data.username).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    async_db: AsyncSession | None = Depends(get_async_db),
+) -> DBUser:
+    user = await _load_user(_decode_token(token), db, async_db)
+    user_cache.set(user.username, AuthenticatedUser.model_validate(user))
+    return user
+
+
+async def get_current_identity(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    async_db: AsyncSession | None = Depends(get_async_db),
+) -> AuthenticatedUser:
+    """Like get_current_user, but served from the user cache when possible."""
+    token_data = _decode_token(token)
+    identity = user_cache.get(token_data.username)
+    if identity is None:
+        user = await _load_user(token_data, db, async_db)
+        identity = AuthenticatedUser.model_validate(user)
+        user_cache.set(user.username, identity)
+    return identity
+
+
+def require_metrics_token(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> None:
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, METRICS_TOKEN):
+        raise _credentials_exception()
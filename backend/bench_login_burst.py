@@ -0,0 +1,91 @@
+"""Login-burst benchmark for password hashing off the event loop.
+
+Fires a burst of concurrent POST /token requests through the ASGI app while a
+probe keeps calling GET / and records its latency. With hashing offloaded the
+probe latency stays flat during the burst; PASSWORD_HASH_WORKERS=0 hashes
+inline on the event loop for comparison. Requires httpx.
+
+    python bench_login_burst.py --logins 40
+    PASSWORD_HASH_WORKERS=0 python bench_login_burst.py --logins 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40, help="concurrent logins")
+    parser.add_argument(
+        "--probe-interval", type=float, default=0.01, help="seconds between probes"
+    )
+    return parser.parse_args()
+
+
+async def run(args, app):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        probe_latencies = []
+        burst_done = asyncio.Event()
+
+        async def probe():
+            # Latency counts from when the probe was due, so time spent waiting
+            # for a blocked event loop to wake the probe is included.
+            while not burst_done.is_set():
+                due = time.perf_counter() + args.probe_interval
+                await asyncio.sleep(args.probe_interval)
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - due)
+
+        async def login():
+            response = await client.post(
+                "/token", data={"username": "bench", "password": "bench-password"}
+            )
+            response.raise_for_status()
+
+        probe_task = asyncio.create_task(probe())
+        await asyncio.sleep(0.1)
+        burst_start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        burst_elapsed = time.perf_counter() - burst_start
+        burst_done.set()
+        await probe_task
+    return burst_elapsed, sorted(probe_latencies)
+
+
+def main():
+    args = parse_args()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="syllaby-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DATABASE_ASYNC"] = "false"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+
+    import auth, crud, database, main as app_module, schemas
+
+    db = database.SessionLocal()
+    crud.create_user(
+        db,
+        schemas.UserCreate(
+            username="bench", email="bench@example.com", password="bench-password"
+        ),
+    )
+    db.close()
+
+    burst_elapsed, probes = asyncio.run(run(args, app_module.app))
+    p95 = probes[max(int(len(probes) * 0.95) - 1, 0)]
+    print(f"hash workers:   {auth.PASSWORD_HASH_WORKERS or 'inline (event loop)'}")
+    print(f"bcrypt rounds:  {auth.BCRYPT_ROUNDS}")
+    print(f"logins:         {args.logins} in {burst_elapsed:.2f}s "
+          f"({args.logins / burst_elapsed:.1f} logins/s)")
+    print(f"probe GET /:    {len(probes)} samples, "
+          f"median {statistics.median(probes) * 1000:.1f} ms, "
+          f"p95 {p95 * 1000:.1f} ms, max {probes[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Response size benchmark for compression and the syllabus detail payload.
+
+Seeds a temporary SQLite database with a long syllabus, a large board and a
+page of notes, then fetches them through the ASGI app with and without
+Accept-Encoding and reports bytes on the wire and median latency. The syllabus
+is fetched both with include_raw=true (the old payload, plan sent twice) and
+without. It also times FastAPI's response_model serializer against orjson on
+the syllabus payload. Requires httpx; orjson is optional.
+
+    python bench_response_size.py --weeks 16 --tasks 400 --repeat 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=16, help="syllabus weeks")
+    parser.add_argument("--tasks", type=int, default=400, help="tasks on the board")
+    parser.add_argument("--notes", type=int, default=100, help="notes in the list")
+    parser.add_argument("--repeat", type=int, default=30, help="requests per case")
+    return parser.parse_args()
+
+
+def generated_plan(weeks: int) -> str:
+    return json.dumps(
+        {
+            "introduction": "A structured plan covering the full course outline. " * 4,
+            "weeks": [
+                {
+                    "week_number": n,
+                    "title": f"Week {n}: Core concepts and worked examples",
+                    "learning_objectives": [
+                        f"Explain the main result of topic {n}.{i}" for i in range(4)
+                    ],
+                    "daily_tasks": [
+                        {"day": day, "tasks": [f"Read section {n}.{i}" for i in range(3)]}
+                        for day in ("Monday", "Wednesday", "Friday")
+                    ],
+                    "quiz_topics": [f"Topic {n}.{i}" for i in range(3)],
+                    "resources": [
+                        {"type": "Video", "description": f"Lecture {n}", "source": "YouTube"}
+                    ],
+                }
+                for n in range(1, weeks + 1)
+            ],
+        }
+    )
+
+
+def seed(args, crud, database, schemas):
+    db = database.SessionLocal()
+    user = crud.create_user(
+        db,
+        schemas.UserCreate(
+            username="bench", email="bench@example.com", password="bench-password"
+        ),
+        hashed_password="not-used",
+    )
+    syllabus = crud.create_user_syllaby(
+        db,
+        schemas.SyllabusCreate(
+            title="Benchmark Course",
+            raw_input_outline="Outline " * 50,
+            duration=args.weeks,
+            unit="weeks",
+        ),
+        user_id=user.id,
+        generated_content=generated_plan(args.weeks),
+    )
+    per_column = max(args.tasks // 3, 1)
+    board = crud.create_kanban_board_from_ai(
+        db,
+        syllabus_id=syllabus.id,
+        ai_kanban_data=[
+            schemas.KanbanColumnCreate(
+                title=title,
+                tasks=[f"{title} task {i}: review the chapter" for i in range(per_column)],
+            )
+            for title in ("To Do", "In Progress", "Done")
+        ],
+    )
+    for i in range(args.notes):
+        crud.create_user_note(
+            db,
+            schemas.NoteCreate(
+                title=f"Note {i}",
+                original_content="Lecture notes on the week's material. " * 20,
+            ),
+            user_id=user.id,
+        )
+    ids = user.username, syllabus.id, board.id
+    db.close()
+    return ids
+
+
+async def fetch(app, headers, url, repeat):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+        wire_bytes = int(response.headers.get("content-length", len(response.content)))
+        return wire_bytes, response.headers.get("content-encoding", "identity"), latencies
+
+
+def time_serializers(app_module, schemas, syllabus_id, repeat):
+    from pydantic import TypeAdapter
+
+    db = app_module.database.SessionLocal()
+    detail = app_module._syllabus_detail(
+        app_module.crud.get_syllaby(db, syllabus_id), include_raw=True
+    )
+    db.close()
+    adapter = TypeAdapter(schemas.SyllabusDetail)
+    cases = {"pydantic dump_json (default)": lambda: adapter.dump_json(detail)}
+    try:
+        import orjson
+
+        cases["model_dump + orjson"] = lambda: orjson.dumps(detail.model_dump(mode="json"))
+    except ImportError:
+        pass
+    cases["model_dump + json.dumps"] = lambda: json.dumps(
+        detail.model_dump(mode="json")
+    ).encode()
+    for name, serialize in cases.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            samples.append(time.perf_counter() - start)
+        print(f"  {name:32} {statistics.median(samples) * 1e6:8.0f} us")
+
+
+def main():
+    args = parse_args()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="syllaby-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DATABASE_ASYNC"] = "false"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+
+    import auth, crud, database, main as app_module, schemas
+
+    username, syllabus_id, board_id = seed(args, crud, database, schemas)
+    token = auth.create_access_token(data={"sub": username})
+    cases = [
+        ("syllabus, raw included", f"/syllaby/{syllabus_id}?include_raw=true"),
+        ("syllabus", f"/syllaby/{syllabus_id}"),
+        ("board", f"/kanban/{board_id}"),
+        ("notes list", f"/notes?limit={args.notes}"),
+    ]
+    print(f"compression:    {app_module.app.user_middleware[0].cls.__name__}, "
+          f"minimum size {app_module.COMPRESSION_MINIMUM_SIZE} bytes")
+    print(f"  {'case':24} {'encoding':9} {'bytes':>9} {'median ms':>10}")
+    for name, url in cases:
+        for accept in ("identity", "gzip, br"):
+            headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": accept}
+            wire_bytes, encoding, latencies = asyncio.run(
+                fetch(app_module.app, headers, url, args.repeat)
+            )
+            print(f"  {name:24} {encoding:9} {wire_bytes:9d} "
+                  f"{statistics.median(latencies) * 1000:10.2f}")
+    print("syllabus detail serialization:")
+    time_serializers(app_module, schemas, syllabus_id, args.repeat * 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Concurrent-writer benchmark for the SQLite engine profile.
+
+Runs N threads that each perform kanban moves, task updates and quiz
+submissions against a fresh SQLite file, then reports throughput, latency and
+the number of "database is locked" errors. Exits non-zero if any write failed.
+
+    python bench_sqlite_writes.py --writers 16 --ops 50
+    python bench_sqlite_writes.py --writers 16 --ops 50 --no-profile
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=50, help="write operations per writer")
+    parser.add_argument(
+        "--no-profile",
+        action="store_true",
+        help="use default SQLite journaling and no write retries as a baseline",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="syllaby-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DATABASE_ASYNC"] = "false"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    os.environ["DB_POOL_SIZE"] = str(args.writers)
+    os.environ["DB_MAX_OVERFLOW"] = "0"
+    if args.no_profile:
+        os.environ["SQLITE_PROFILE"] = "false"
+        os.environ["SQLITE_WRITE_RETRIES"] = "0"
+
+    from sqlalchemy.exc import OperationalError
+    import crud, database, models, schemas
+
+    models.Base.metadata.create_all(bind=database.engine)
+    setup_db = database.SessionLocal()
+    user = models.User(username="bench", email="bench@example.com", hashed_password="x")
+    setup_db.add(user)
+    setup_db.commit()
+    user_id = user.id
+    board = crud.create_user_kanban_board(
+        setup_db, schemas.KanbanBoardCreate(title="Bench Board"), user_id=user_id
+    )
+    column_ids = [column.id for column in board.columns]
+    setup_db.close()
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.writers)
+
+    def writer(writer_index: int):
+        db = database.SessionLocal()
+        task = crud.create_kanban_task(
+            db,
+            schemas.KanbanTaskCreate(title=f"writer {writer_index}"),
+            column_id=column_ids[0],
+            user_id=user_id,
+        )
+        start_barrier.wait()
+        for op_index in range(args.ops):
+            op_start = time.perf_counter()
+            try:
+                kind = op_index % 3
+                if kind == 0:
+                    crud.move_kanban_task(
+                        db,
+                        schemas.KanbanTaskMove(
+                            task_id=task.id,
+                            source_column_id=task.column_id,
+                            destination_column_id=column_ids[op_index % len(column_ids)],
+                            destination_index=op_index % 5,
+                        ),
+                        user_id=user_id,
+                    )
+                elif kind == 1:
+                    crud.update_kanban_task(
+                        db,
+                        task,
+                        schemas.KanbanTaskUpdate(completed=op_index % 2 == 0),
+                        user_id=user_id,
+                    )
+                else:
+                    crud.create_quiz_attempt(
+                        db, user_id=user_id, score=op_index % 101, topic="bench"
+                    )
+            except OperationalError as e:
+                db.rollback()
+                with lock:
+                    errors.append(str(e.orig))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - op_start)
+        db.close()
+
+    threads = [
+        threading.Thread(target=writer, args=(index,)) for index in range(args.writers)
+    ]
+    bench_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - bench_start
+
+    total_ops = args.writers * args.ops
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    print(f"profile:        {'off' if args.no_profile else 'on'}")
+    print(f"writers x ops:  {args.writers} x {args.ops} = {total_ops}")
+    print(f"succeeded:      {len(latencies)}")
+    print(f"lock errors:    {len(errors)}")
+    print(f"elapsed:        {elapsed:.2f}s ({len(latencies) / elapsed:.1f} writes/s)")
+    if latencies:
+        print(f"latency median: {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"latency p95:    {p95 * 1000:.1f} ms")
+    if errors:
+        print(f"first error:    {errors[0]}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
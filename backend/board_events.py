@@ -0,0 +1,93 @@
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Set, Tuple
+
+# Per-board fan-out of task diffs for the /kanban/{board_id}/events stream.
+#
+# CRUD mutations publish after they commit, from whichever thread they run on.
+# Messages go through a pub/sub channel per board and every process fans them
+# out to its own subscribers' queues. LocalPubSub is an in-process stand-in for
+# a shared broker: with several workers, swap in a client for one (e.g. Redis
+# pub/sub) exposing the same publish/add_listener pair so that every worker
+# receives every message.
+
+SUBSCRIBER_QUEUE_SIZE = 100
+RESYNC_MESSAGE = json.dumps({"events": [{"type": "resync"}]})
+
+
+class LocalPubSub:
+    """Delivers published messages to listeners in this process only."""
+
+    def __init__(self):
+        self._listeners: List[Callable[[str, str], None]] = []
+
+    def add_listener(self, listener: Callable[[str, str], None]) -> None:
+        self._listeners.append(listener)
+
+    def publish(self, channel: str, message: str) -> None:
+        for listener in list(self._listeners):
+            listener(channel, message)
+
+
+def _deliver(queue: asyncio.Queue, message: str) -> None:
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # A subscriber that can't keep up loses its backlog and is told to
+        # refetch the board instead of falling further behind.
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC_MESSAGE)
+
+
+class BoardEventHub:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+        self._lock = threading.Lock()
+        self._subscribers: Dict[
+            int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]
+        ] = {}
+        pubsub.add_listener(self._on_message)
+
+    @staticmethod
+    def _channel(board_id: int) -> str:
+        return f"board:{board_id}"
+
+    @contextmanager
+    def subscribe(self, board_id: int):
+        """Yields a queue of JSON messages for the board until the block exits."""
+        subscriber = (
+            asyncio.get_running_loop(),
+            asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE),
+        )
+        with self._lock:
+            self._subscribers.setdefault(board_id, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                board_subscribers = self._subscribers.get(board_id, set())
+                board_subscribers.discard(subscriber)
+                if not board_subscribers:
+                    self._subscribers.pop(board_id, None)
+
+    def publish(self, board_id: int, events: List[dict]) -> None:
+        if events:
+            message = json.dumps({"board_id": board_id, "events": events})
+            self._pubsub.publish(self._channel(board_id), message)
+
+    def _on_message(self, channel: str, message: str) -> None:
+        board_id = int(channel.rsplit(":", 1)[1])
+        with self._lock:
+            subscribers = list(self._subscribers.get(board_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has already closed.
+                pass
+
+
+hub = BoardEventHub(LocalPubSub())
@@ -1,10 +1,37 @@
-from sqlalchemy import desc, func, or_
-from sqlalchemy.orm import Session
+import json
+import os
+from collections import Counter
+from sqlalchemy import and_, desc, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
 import models, schemas
-from auth import get_password_hash
+from auth import get_password_hash, invalidate_cached_user
+from board_events import hub as board_event_hub
+from database import retry_on_locked
+from pagination import (
+    CHALLENGE_PAGE_KEY,
+    DEFAULT_PAGE_SIZE,
+    NOTE_PAGE_KEY,
+    QUIZ_ATTEMPT_PAGE_KEY,
+    SYLLABUS_PAGE_KEY,
+    TASK_PAGE_KEY,
+    apply_keyset,
+    split_page,
+)
 from typing import List
 from datetime import date, timedelta, datetime
 
+# Tasks are ordered by sparse integer positions so a move only rewrites the
+# moved row; a column is renumbered only once two neighbours run out of room.
+POSITION_GAP = 1024
+# Deletions older than this are pruned; /sync sends a full resync to clients
+# whose token predates the cutoff.
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+
+def get_user(db: Session, user_id: int) -> models.User | None:
+    return db.get(models.User, user_id)
+
 
 def get_user_by_username(db: Session, username: str) -> models.User | None:
     return db.query(models.User).filter(models.User.username == username).first()
@@ -24,8 +51,12 @@ def get_user_by_username_or_email(db: Session, identifier: str) -> models.User |
     )
 
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    hashed_password = get_password_hash(user.password)
+@retry_on_locked
+def create_user(
+    db: Session, user: schemas.UserCreate, hashed_password: str | None = None
+) -> models.User:
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         username=user.username, email=user.email, hashed_password=hashed_password
     )
@@ -34,6 +65,15 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     db.refresh(db_user)
     return db_user
 
+
+@retry_on_locked
+def update_user_password_hash(
+    db: Session, user: models.User, hashed_password: str
+) -> models.User:
+    user.hashed_password = hashed_password
+    db.commit()
+    return user
+
 def create_user_syllaby(
     db: Session, syllaby: schemas.SyllabusCreate, user_id: int, generated_content: str
 ) -> models.Syllabus:
@@ -53,22 +93,26 @@ def create_user_syllaby(
 
 
 def get_syllaby_by_user(
-    db: Session, user_id: int, skip: int = 0, limit: int = 100
-) -> list[models.Syllabus]:
-    return (
-        db.query(models.Syllabus)
-        .filter(models.Syllabus.owner_id == user_id)
-        .order_by(desc(models.Syllabus.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    db: Session, user_id: int, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[list[models.Syllabus], str | None]:
+    query = db.query(models.Syllabus).filter(models.Syllabus.owner_id == user_id)
+    query = apply_keyset(query, SYLLABUS_PAGE_KEY, cursor, limit, descending=True)
+    return split_page(query.all(), SYLLABUS_PAGE_KEY, limit)
 
 
 def get_syllaby(db: Session, syllaby_id: int) -> models.Syllabus | None:
     return db.query(models.Syllabus).filter(models.Syllabus.id == syllaby_id).first()
 
 
+def get_syllaby_version(db: Session, syllaby_id: int, user_id: int) -> tuple | None:
+    """(created_at, version) of an owned syllabus, without loading its content."""
+    return (
+        db.query(models.Syllabus.created_at, models.Syllabus.version)
+        .filter(models.Syllabus.id == syllaby_id, models.Syllabus.owner_id == user_id)
+        .first()
+    )
+
+
 def get_syllaby_by_ids(
     db: Session, syllaby_ids: List[int], user_id: int
 ) -> List[models.Syllabus]:
@@ -81,12 +125,29 @@ def get_syllaby_by_ids(
     )
 
 
+def _bump_version(db_object) -> None:
+    # Evaluated in the UPDATE itself, so concurrent writers can't both read and
+    # write back the same number.
+    db_object.version = type(db_object).version + 1
+
+
+def _bump_board_version(db: Session, board_id: int) -> None:
+    db.execute(
+        update(models.KanbanBoard)
+        .where(models.KanbanBoard.id == board_id)
+        .values(version=models.KanbanBoard.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@retry_on_locked
 def update_syllaby(
     db: Session, db_syllaby: models.Syllabus, syllaby_update: schemas.SyllabusUpdate
 ) -> models.Syllabus:
     update_data = syllaby_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_syllaby, key, value)
+    _bump_version(db_syllaby)
     db.add(db_syllaby)
     db.commit()
     db.refresh(db_syllaby)
@@ -98,8 +159,21 @@ def delete_syllaby(db: Session, syllaby_id: int) -> bool:
         db.query(models.Syllabus).filter(models.Syllabus.id == syllaby_id).first()
     )
     if db_syllaby:
+        total, completed = 0, 0
+        board_id = None
+        if db_syllaby.kanban_board:
+            board_id = db_syllaby.kanban_board.id
+            total, completed = _board_task_counts(db, board_id)
+            _record_board_tombstones(db, db_syllaby.owner_id, board_id)
+        _record_tombstones(db, db_syllaby.owner_id, "syllaby", [db_syllaby.id])
+        _delete_pooled_questions(db, db_syllaby.owner_id, "syllabus", db_syllaby.id)
         db.delete(db_syllaby)
+        _bump_progress(
+            db, db_syllaby.owner_id, total_tasks=-total, completed_tasks=-completed
+        )
         db.commit()
+        if board_id is not None:
+            board_event_hub.publish(board_id, [{"type": "board_deleted"}])
         return True
     return False
 
@@ -115,6 +189,7 @@ def get_most_recent_syllabus_by_user(
     )
 
 
+@retry_on_locked
 def create_user_note(
     db: Session,
     note: schemas.NoteCreate,
@@ -133,16 +208,19 @@ def create_user_note(
     db.flush()
 
     if key_terms:
-        for term_text in key_terms:
-            db_key_term = models.KeyTerm(term=term_text, note_id=db_note.id)
-            db.add(db_key_term)
+        db.execute(
+            insert(models.KeyTerm),
+            [{"term": term_text, "note_id": db_note.id} for term_text in key_terms],
+        )
 
     if flashcards:
-        for fc in flashcards:
-            db_flashcard = models.Flashcard(
-                front=fc.front, back=fc.back, note_id=db_note.id
-            )
-            db.add(db_flashcard)
+        db.execute(
+            insert(models.Flashcard),
+            [
+                {"front": fc.front, "back": fc.back, "note_id": db_note.id}
+                for fc in flashcards
+            ],
+        )
 
     db.commit()
     db.refresh(db_note)
@@ -150,15 +228,11 @@ def create_user_note(
 
 
 def get_notes_by_user(
-    db: Session, user_id: int, skip: int = 0, limit: int = 100
-) -> list[models.Note]:
-    return (
-        db.query(models.Note)
-        .filter(models.Note.owner_id == user_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    db: Session, user_id: int, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[list[models.Note], str | None]:
+    query = db.query(models.Note).filter(models.Note.owner_id == user_id)
+    query = apply_keyset(query, NOTE_PAGE_KEY, cursor, limit, descending=True)
+    return split_page(query.all(), NOTE_PAGE_KEY, limit)
 
 
 def get_note(db: Session, note_id: int) -> models.Note | None:
@@ -175,6 +249,7 @@ def get_notes_by_ids(
     )
 
 
+@retry_on_locked
 def update_note(
     db: Session, db_note: models.Note, note_update: schemas.NoteUpdate
 ) -> models.Note:
@@ -186,32 +261,67 @@ def update_note(
     fields_set = getattr(note_update, 'model_fields_set', getattr(note_update, '__fields_set__', set()))
 
     if "key_terms" in fields_set:
-        db.query(models.KeyTerm).filter(models.KeyTerm.note_id == db_note.id).delete(
-            synchronize_session=False
+        _sync_note_children(
+            db,
+            models.KeyTerm,
+            db_note.id,
+            [{"term": term_text} for term_text in note_update.key_terms or []],
+            ("term",),
         )
-        if note_update.key_terms is not None:
-            for term_text in note_update.key_terms:
-                db_key_term = models.KeyTerm(term=term_text, note_id=db_note.id)
-                db.add(db_key_term)
 
     if "flashcards" in fields_set:
-        db.query(models.Flashcard).filter(
-            models.Flashcard.note_id == db_note.id
-        ).delete(synchronize_session=False)
-        if note_update.flashcards is not None:
-            for fc in note_update.flashcards: 
-                db_flashcard = models.Flashcard(
-                    front=fc.front, back=fc.back, note_id=db_note.id
-                )
-                db.add(db_flashcard)
+        _sync_note_children(
+            db,
+            models.Flashcard,
+            db_note.id,
+            [{"front": fc.front, "back": fc.back} for fc in note_update.flashcards or []],
+            ("front", "back"),
+        )
+
+    if fields_set & {"key_terms", "flashcards"}:
+        db_note.updated_at = models.change_time()
 
     db.commit()
     db.refresh(db_note)
     return db_note
 
+
+def _sync_note_children(
+    db: Session, model, note_id: int, desired: List[dict], fields: tuple[str, ...]
+) -> None:
+    existing = (
+        db.query(model.id, *[getattr(model, field) for field in fields])
+        .filter(model.note_id == note_id)
+        .all()
+    )
+    remaining = Counter(tuple(row[field] for field in fields) for row in desired)
+    stale_ids = []
+    for row in existing:
+        key = tuple(row[1:])
+        if remaining[key] > 0:
+            remaining[key] -= 1
+        else:
+            stale_ids.append(row.id)
+
+    if stale_ids:
+        db.query(model).filter(model.id.in_(stale_ids)).delete(
+            synchronize_session=False
+        )
+    new_rows = [
+        {**dict(zip(fields, key)), "note_id": note_id}
+        for key, count in remaining.items()
+        for _ in range(count)
+    ]
+    if new_rows:
+        db.execute(insert(model), new_rows)
+
+
+@retry_on_locked
 def delete_note(db: Session, note_id: int) -> bool:
     db_note = db.query(models.Note).filter(models.Note.id == note_id).first()
     if db_note:
+        _record_tombstones(db, db_note.owner_id, "notes", [db_note.id])
+        _delete_pooled_questions(db, db_note.owner_id, "note", db_note.id)
         db.delete(db_note)
         db.commit()
         return True
@@ -253,6 +363,32 @@ def get_kanban_board(
     )
 
 
+def get_kanban_board_version(db: Session, board_id: int, user_id: int) -> tuple | None:
+    """The board's version counter plus its task count and task version total.
+
+    Every write to the board or to one of its columns or tasks bumps the board
+    version, so the tuple identifies the board's contents without loading them.
+    """
+    return (
+        db.query(
+            models.KanbanBoard.version,
+            func.count(models.KanbanTask.id),
+            func.coalesce(func.sum(models.KanbanTask.version), 0),
+        )
+        .outerjoin(
+            models.KanbanColumn, models.KanbanColumn.board_id == models.KanbanBoard.id
+        )
+        .outerjoin(
+            models.KanbanTask, models.KanbanTask.column_id == models.KanbanColumn.id
+        )
+        .filter(
+            models.KanbanBoard.id == board_id, models.KanbanBoard.owner_id == user_id
+        )
+        .group_by(models.KanbanBoard.id)
+        .first()
+    )
+
+
 def create_kanban_board_from_ai(
     db: Session, syllabus_id: int, ai_kanban_data: List[schemas.KanbanColumnCreate]
 ) -> models.KanbanBoard | None:
@@ -269,16 +405,30 @@ def create_kanban_board_from_ai(
     db.add(db_board)
     db.flush()
 
-    for column_data in ai_kanban_data:
-        db_column = models.KanbanColumn(title=column_data.title, board_id=db_board.id)
-        db.add(db_column)
-        db.flush()
-
-        for index, task_title in enumerate(column_data.tasks):
-            db_task = models.KanbanTask(
-                title=task_title, column_id=db_column.id, position=index
-            )
-            db.add(db_task)
+    column_ids = []
+    if ai_kanban_data:
+        column_ids = db.scalars(
+            insert(models.KanbanColumn).returning(
+                models.KanbanColumn.id, sort_by_parameter_order=True
+            ),
+            [
+                {"title": column_data.title, "board_id": db_board.id}
+                for column_data in ai_kanban_data
+            ],
+        ).all()
+
+    task_rows = [
+        {
+            "title": task_title,
+            "column_id": column_id,
+            "position": (index + 1) * POSITION_GAP,
+        }
+        for column_id, column_data in zip(column_ids, ai_kanban_data)
+        for index, task_title in enumerate(column_data.tasks)
+    ]
+    if task_rows:
+        db.execute(insert(models.KanbanTask), task_rows)
+        _bump_progress(db, db_syllabus.owner_id, total_tasks=len(task_rows))
 
     db.commit()
     db.refresh(db_board)
@@ -304,12 +454,73 @@ def delete_kanban_board(db: Session, board_id: int, user_id: int) -> bool:
         .first()
     )
     if db_board:
+        total, completed = _board_task_counts(db, db_board.id)
+        _record_board_tombstones(db, user_id, db_board.id)
         db.delete(db_board)
+        _bump_progress(db, user_id, total_tasks=-total, completed_tasks=-completed)
         db.commit()
+        board_event_hub.publish(board_id, [{"type": "board_deleted"}])
         return True
     return False
 
 
+def _board_task_counts(db: Session, board_id: int) -> tuple[int, int]:
+    return (
+        db.query(
+            func.count(models.KanbanTask.id),
+            func.count(models.KanbanTask.id).filter(
+                models.KanbanTask.completed == True
+            ),
+        )
+        .join(models.KanbanColumn)
+        .filter(models.KanbanColumn.board_id == board_id)
+        .one()
+    )
+
+
+def _record_tombstones(
+    db: Session, user_id: int, entity: str, entity_ids: List[int]
+) -> None:
+    if entity_ids:
+        db.query(models.SyncTombstone).filter(
+            models.SyncTombstone.user_id == user_id,
+            models.SyncTombstone.deleted_at < sync_retention_cutoff(db),
+        ).delete(synchronize_session=False)
+        db.execute(
+            insert(models.SyncTombstone),
+            [
+                {"user_id": user_id, "entity": entity, "entity_id": entity_id}
+                for entity_id in entity_ids
+            ],
+        )
+
+
+def _record_board_tombstones(db: Session, user_id: int, board_id: int) -> None:
+    task_ids = [
+        task_id
+        for (task_id,) in db.query(models.KanbanTask.id)
+        .join(models.KanbanColumn)
+        .filter(models.KanbanColumn.board_id == board_id)
+    ]
+    _record_tombstones(db, user_id, "kanban_tasks", task_ids)
+    _record_tombstones(db, user_id, "kanban_boards", [board_id])
+
+
+def _task_event(event_type: str, task: models.KanbanTask, **extra) -> dict:
+    payload = schemas.KanbanTask.model_validate(task).model_dump(mode="json")
+    return {"type": event_type, "task": payload, **extra}
+
+
+def _next_position(db: Session, column_id: int) -> int:
+    max_position = (
+        db.query(func.max(models.KanbanTask.position))
+        .filter(models.KanbanTask.column_id == column_id)
+        .scalar()
+    )
+    return (max_position + POSITION_GAP) if max_position is not None else POSITION_GAP
+
+
+@retry_on_locked
 def create_kanban_task(
     db: Session, task: schemas.KanbanTaskCreate, column_id: int, user_id: int
 ) -> models.KanbanTask | None:
@@ -323,21 +534,18 @@ def create_kanban_task(
     )
     if not column:
         return None
-    max_position = (
-        db.query(func.max(models.KanbanTask.position))
-        .filter(models.KanbanTask.column_id == column_id)
-        .scalar()
-    )
-    new_position = (max_position + 1) if max_position is not None else 0
     db_task = models.KanbanTask(
         title=task.title,
         column_id=column_id,
-        position=new_position,
+        position=_next_position(db, column_id),
         due_date=task.due_date,
     )
     db.add(db_task)
+    _bump_board_version(db, column.board_id)
+    _bump_progress(db, user_id, total_tasks=1)
     db.commit()
     db.refresh(db_task)
+    board_event_hub.publish(column.board_id, [_task_event("create", db_task)])
     return db_task
 
 
@@ -351,88 +559,353 @@ def get_task_by_id(db: Session, task_id: int, user_id: int) -> models.KanbanTask
     )
 
 
+def _completion_delta(db_task: models.KanbanTask, update_data: dict) -> int:
+    if "completed" not in update_data or update_data["completed"] is None:
+        return 0
+    return int(bool(update_data["completed"])) - int(bool(db_task.completed))
+
+
+@retry_on_locked
 def update_kanban_task(
-    db: Session, db_task: models.KanbanTask, task_update: schemas.KanbanTaskUpdate
+    db: Session,
+    db_task: models.KanbanTask,
+    task_update: schemas.KanbanTaskUpdate,
+    user_id: int,
 ) -> models.KanbanTask:
     update_data = task_update.dict(exclude_unset=True)
+    completed_delta = _completion_delta(db_task, update_data)
     for key, value in update_data.items():
         setattr(db_task, key, value)
+    _bump_version(db_task)
     db.add(db_task)
+    _bump_board_version(db, db_task.column.board_id)
+    if completed_delta:
+        _touch_task_challenges(db, [db_task.id])
+    _bump_progress(db, user_id, completed_tasks=completed_delta)
     db.commit()
     db.refresh(db_task)
+    board_event_hub.publish(db_task.column.board_id, [_task_event("update", db_task)])
     return db_task
 
 
+@retry_on_locked
 def delete_kanban_task(db: Session, task_id: int, user_id: int) -> bool:
     db_task = get_task_by_id(db, task_id, user_id)
     if db_task:
-        (
-            db.query(models.KanbanTask)
-            .filter(
-                models.KanbanTask.column_id == db_task.column_id,
-                models.KanbanTask.position > db_task.position,
-            )
-            .update(
-                {models.KanbanTask.position: models.KanbanTask.position - 1},
-                synchronize_session=False,
-            )
-        )
+        board_id = db_task.column.board_id
+        _record_tombstones(db, user_id, "kanban_tasks", [db_task.id])
+        _touch_task_challenges(db, [db_task.id])
         db.delete(db_task)
+        _bump_board_version(db, board_id)
+        _bump_progress(
+            db, user_id, total_tasks=-1, completed_tasks=-int(bool(db_task.completed))
+        )
         db.commit()
+        board_event_hub.publish(board_id, [{"type": "delete", "task_id": task_id}])
         return True
     return False
 
 
-def get_all_tasks_by_user(db: Session, user_id: int) -> List[models.KanbanTask]:
-    return (
+def get_all_tasks_by_user(
+    db: Session, user_id: int, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[List[models.KanbanTask], str | None]:
+    query = (
         db.query(models.KanbanTask)
         .join(models.KanbanColumn)
         .join(models.KanbanBoard)
         .filter(models.KanbanBoard.owner_id == user_id)
-        .all()
     )
+    query = apply_keyset(query, TASK_PAGE_KEY, cursor, limit)
+    return split_page(query.all(), TASK_PAGE_KEY, limit)
 
-def move_kanban_task(
-    db: Session, move_data: schemas.KanbanTaskMove, user_id: int
-) -> models.KanbanTask | None:
-    task_to_move = get_task_by_id(db, move_data.task_id, user_id)
-    if not task_to_move:
-        return None
-    source_column_id = task_to_move.column_id
-    source_position = task_to_move.position
 
-    (
-        db.query(models.KanbanTask)
+def _tasks_due_between(
+    query, user_id: int, start: datetime, end: datetime, include_completed: bool
+):
+    query = (
+        query.select_from(models.KanbanTask)
+        .join(models.KanbanColumn)
+        .join(models.KanbanBoard)
         .filter(
-            models.KanbanTask.column_id == source_column_id,
-            models.KanbanTask.position > source_position,
-        )
-        .update(
-            {models.KanbanTask.position: models.KanbanTask.position - 1},
-            synchronize_session=False,
+            models.KanbanBoard.owner_id == user_id,
+            models.KanbanTask.due_date >= start,
+            models.KanbanTask.due_date < end,
         )
     )
+    if not include_completed:
+        query = query.filter(models.KanbanTask.completed == False)
+    return query
+
+
+def get_tasks_due_between(
+    db: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    include_completed: bool = True,
+) -> list:
+    """Calendar projection of tasks due in [start, end), without loading ORM rows."""
+    query = db.query(
+        models.KanbanTask.id,
+        models.KanbanTask.title,
+        models.KanbanTask.priority,
+        models.KanbanTask.due_date,
+        models.KanbanTask.completed,
+        models.KanbanTask.column_id,
+        models.KanbanColumn.title.label("column_title"),
+        models.KanbanBoard.id.label("board_id"),
+        models.KanbanBoard.title.label("board_title"),
+    )
+    query = _tasks_due_between(query, user_id, start, end, include_completed)
+    return query.order_by(models.KanbanTask.due_date, models.KanbanTask.id).all()
+
+
+def get_task_counts_by_day(
+    db: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    include_completed: bool = True,
+) -> list:
+    day = func.date(models.KanbanTask.due_date)
+    query = db.query(
+        day.label("day"),
+        func.count(models.KanbanTask.id).label("total"),
+        func.count(models.KanbanTask.id)
+        .filter(models.KanbanTask.completed == True)
+        .label("completed"),
+    )
+    query = _tasks_due_between(query, user_id, start, end, include_completed)
+    return query.group_by(day).order_by(day).all()
+
 
-    (
+def _rebalance_column(db: Session, column_id: int) -> None:
+    tasks = (
         db.query(models.KanbanTask)
+        .filter(models.KanbanTask.column_id == column_id)
+        .order_by(models.KanbanTask.position, models.KanbanTask.id)
+        .all()
+    )
+    for index, task in enumerate(tasks):
+        task.position = (index + 1) * POSITION_GAP
+        _bump_version(task)
+    db.flush()
+
+
+def _neighbour_positions(
+    db: Session, column_id: int, index: int, exclude_task_id: int
+) -> tuple[int | None, int | None]:
+    index = max(index, 0)
+    rows = (
+        db.query(models.KanbanTask.position)
         .filter(
-            models.KanbanTask.column_id == move_data.destination_column_id,
-            models.KanbanTask.position >= move_data.destination_index,
+            models.KanbanTask.column_id == column_id,
+            models.KanbanTask.id != exclude_task_id,
         )
-        .update(
-            {models.KanbanTask.position: models.KanbanTask.position + 1},
-            synchronize_session=False,
+        .order_by(models.KanbanTask.position, models.KanbanTask.id)
+        .offset(max(index - 1, 0))
+        .limit(2 if index > 0 else 1)
+        .all()
+    )
+    positions = [row[0] for row in rows]
+    if index > 0 and not positions:
+        last_position = (
+            db.query(func.max(models.KanbanTask.position))
+            .filter(
+                models.KanbanTask.column_id == column_id,
+                models.KanbanTask.id != exclude_task_id,
+            )
+            .scalar()
         )
+        return last_position, None
+    if index == 0:
+        return None, (positions[0] if positions else None)
+    before = positions[0] if positions else None
+    after = positions[1] if len(positions) > 1 else None
+    return before, after
+
+
+def _position_for_index(
+    db: Session, column_id: int, index: int, exclude_task_id: int
+) -> int:
+    before, after = _neighbour_positions(db, column_id, index, exclude_task_id)
+    if before is None and after is None:
+        return POSITION_GAP
+    if before is None:
+        return after - POSITION_GAP
+    if after is None:
+        return before + POSITION_GAP
+    if after - before < 2:
+        _rebalance_column(db, column_id)
+        before, after = _neighbour_positions(db, column_id, index, exclude_task_id)
+        if after is None:
+            return before + POSITION_GAP
+    return (before + after) // 2
+
+
+def _move_task(
+    db: Session, task: models.KanbanTask, destination_column_id: int, destination_index: int
+) -> None:
+    task.position = _position_for_index(
+        db,
+        column_id=destination_column_id,
+        index=destination_index,
+        exclude_task_id=task.id,
     )
+    task.column_id = destination_column_id
+    _bump_version(task)
+
+
+@retry_on_locked
+def move_kanban_task(
+    db: Session, move_data: schemas.KanbanTaskMove, user_id: int
+) -> models.KanbanTask | None:
+    task_to_move = get_task_by_id(db, move_data.task_id, user_id)
+    if not task_to_move:
+        return None
+
+    _move_task(
+        db, task_to_move, move_data.destination_column_id, move_data.destination_index
+    )
+    _bump_board_version(db, task_to_move.column.board_id)
+    _bump_progress(db, user_id)
 
-    task_to_move.column_id = move_data.destination_column_id
-    task_to_move.position = move_data.destination_index
-    
     db.commit()
     db.refresh(task_to_move)
+    board_event_hub.publish(
+        task_to_move.column.board_id,
+        [
+            _task_event(
+                "move", task_to_move, index=max(move_data.destination_index, 0)
+            )
+        ],
+    )
     return task_to_move
 
 
+@retry_on_locked
+def apply_kanban_batch(
+    db: Session,
+    board_id: int,
+    user_id: int,
+    operations: List[schemas.KanbanBatchOperation],
+) -> tuple[List[models.KanbanTask], List[int], bool] | None:
+    board = get_kanban_board(db, board_id=board_id, user_id=user_id)
+    if not board:
+        return None
+    column_ids = {column.id for column in board.columns}
+
+    task_ids = {op.task_id for op in operations if op.op != "create"}
+    tasks = {}
+    if task_ids:
+        tasks = {
+            task.id: task
+            for task in db.query(models.KanbanTask)
+            .filter(
+                models.KanbanTask.id.in_(task_ids),
+                models.KanbanTask.column_id.in_(column_ids),
+            )
+            .all()
+        }
+    if len(tasks) != len(task_ids):
+        return None
+
+    affected = {}
+    deleted_ids = []
+    applied = []
+    completed_any = False
+    total_delta = 0
+    completed_delta = 0
+    challenge_task_ids = []
+    for op in operations:
+        if op.op in ("move", "create") and op.column_id not in column_ids:
+            db.rollback()
+            return None
+        if op.op != "create" and op.task_id not in tasks:
+            db.rollback()
+            return None
+
+        if op.op == "create":
+            db_task = models.KanbanTask(
+                title=op.task.title,
+                column_id=op.column_id,
+                position=_next_position(db, op.column_id),
+                due_date=op.task.due_date,
+            )
+            db.add(db_task)
+            db.flush()
+            total_delta += 1
+            tasks[db_task.id] = db_task
+            affected[db_task.id] = db_task
+            applied.append(("create", db_task.id, None))
+        elif op.op == "move":
+            db_task = tasks[op.task_id]
+            _move_task(db, db_task, op.column_id, op.destination_index)
+            db.flush()
+            affected[db_task.id] = db_task
+            applied.append(("move", db_task.id, max(op.destination_index, 0)))
+        elif op.op == "update":
+            db_task = tasks[op.task_id]
+            if op.changes.completed is True and not db_task.completed:
+                completed_any = True
+            update_data = op.changes.dict(exclude_unset=True)
+            task_completed_delta = _completion_delta(db_task, update_data)
+            if task_completed_delta:
+                challenge_task_ids.append(db_task.id)
+            completed_delta += task_completed_delta
+            for key, value in update_data.items():
+                setattr(db_task, key, value)
+            _bump_version(db_task)
+            affected[db_task.id] = db_task
+            applied.append(("update", db_task.id, None))
+        else:
+            db_task = tasks.pop(op.task_id)
+            total_delta -= 1
+            completed_delta -= int(bool(db_task.completed))
+            _touch_task_challenges(db, [db_task.id])
+            db.delete(db_task)
+            db.flush()
+            affected.pop(op.task_id, None)
+            deleted_ids.append(op.task_id)
+            applied.append(("delete", op.task_id, None))
+
+    _record_tombstones(db, user_id, "kanban_tasks", deleted_ids)
+    _touch_task_challenges(db, challenge_task_ids)
+    if applied:
+        _bump_board_version(db, board_id)
+    _bump_progress(
+        db, user_id, total_tasks=total_delta, completed_tasks=completed_delta
+    )
+    db.commit()
+    affected_tasks = []
+    if affected:
+        affected_tasks = (
+            db.query(models.KanbanTask)
+            .filter(models.KanbanTask.id.in_(affected.keys()))
+            .order_by(models.KanbanTask.column_id, models.KanbanTask.position)
+            .all()
+        )
+    _publish_batch_events(board_id, applied, affected_tasks)
+    return affected_tasks, deleted_ids, completed_any
+
+
+def _publish_batch_events(
+    board_id: int, applied: list, affected_tasks: List[models.KanbanTask]
+) -> None:
+    # Events are replayed in operation order but carry each task's final state;
+    # a task created and deleted within the batch only produces the delete.
+    final = {task.id: task for task in affected_tasks}
+    events = []
+    for event_type, task_id, index in applied:
+        if event_type == "delete":
+            events.append({"type": "delete", "task_id": task_id})
+        elif task_id in final:
+            extra = {"index": index} if event_type == "move" else {}
+            events.append(_task_event(event_type, final[task_id], **extra))
+    board_event_hub.publish(board_id, events)
+
+
+@retry_on_locked
 def update_user_streak(db: Session, user: models.User) -> models.User:
     today = date.today()
     yesterday = today - timedelta(days=1)
@@ -452,14 +925,17 @@ def update_user_streak(db: Session, user: models.User) -> models.User:
 
     db.commit()
     db.refresh(user)
+    invalidate_cached_user(user.username)
     return user
 
 
+@retry_on_locked
 def create_quiz_attempt(
     db: Session, user_id: int, score: int, topic: str
 ) -> models.QuizAttempt:
     db_attempt = models.QuizAttempt(user_id=user_id, score=score, quiz_topic=topic)
     db.add(db_attempt)
+    _bump_progress(db, user_id, quiz_attempts=1, quiz_score_total=score)
     db.commit()
     db.refresh(db_attempt)
     return db_attempt
@@ -477,6 +953,15 @@ def get_recent_quiz_attempts(
     )
 
 
+def get_quiz_attempts_by_user(
+    db: Session, user_id: int, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[List[models.QuizAttempt], str | None]:
+    query = db.query(models.QuizAttempt).filter(models.QuizAttempt.user_id == user_id)
+    query = apply_keyset(query, QUIZ_ATTEMPT_PAGE_KEY, cursor, limit, descending=True)
+    return split_page(query.all(), QUIZ_ATTEMPT_PAGE_KEY, limit)
+
+
+@retry_on_locked
 def create_challenge(
     db: Session, user_id: int, challenge_data: schemas.ChallengeCreate
 ) -> models.Challenge | None:
@@ -502,33 +987,47 @@ def create_challenge(
     )
     db_challenge.tasks.extend(tasks)
     db.add(db_challenge)
+    _bump_progress(db, user_id, active_challenges=1)
     db.commit()
     db.refresh(db_challenge)
+    _attach_challenge_progress(db, [db_challenge])
     return db_challenge
 
 
 def get_active_challenges_by_user(db: Session, user_id: int) -> List[models.Challenge]:
-    return (
+    challenges = (
         db.query(models.Challenge)
         .filter(
             models.Challenge.user_id == user_id, models.Challenge.status == "active"
         )
         .all()
     )
+    return _attach_challenge_progress(db, challenges)
+
+
+def get_active_challenges_page(
+    db: Session, user_id: int, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[List[models.Challenge], str | None]:
+    query = db.query(models.Challenge).filter(
+        models.Challenge.user_id == user_id, models.Challenge.status == "active"
+    )
+    query = apply_keyset(query, CHALLENGE_PAGE_KEY, cursor, limit)
+    challenges, next_cursor = split_page(query.all(), CHALLENGE_PAGE_KEY, limit)
+    return _attach_challenge_progress(db, challenges), next_cursor
 
 
 def get_upcoming_tasks(
-    db: Session, user_id: int, days_ahead: int = 7
+    db: Session, user_id: int, days_ahead: int = 7, days_overdue: int = 30
 ) -> List[models.KanbanTask]:
-    end_date = datetime.now() + timedelta(days=days_ahead)
+    now = datetime.now()
     return (
         db.query(models.KanbanTask)
         .join(models.KanbanColumn)
         .join(models.KanbanBoard)
         .filter(
             models.KanbanBoard.owner_id == user_id,
-            models.KanbanTask.due_date != None,
-            models.KanbanTask.due_date <= end_date,
+            models.KanbanTask.due_date >= now - timedelta(days=days_overdue),
+            models.KanbanTask.due_date <= now + timedelta(days=days_ahead),
             models.KanbanTask.completed == False,
         )
         .order_by(models.KanbanTask.due_date)
@@ -536,50 +1035,489 @@ def get_upcoming_tasks(
     )
     
 def get_task_counts_by_user(db: Session, user_id: int) -> dict:
-    """Gets total and completed task counts efficiently using the database."""
-    total_tasks = (
-        db.query(func.count(models.KanbanTask.id))
+    """Gets total and completed task counts in a single aggregate query."""
+    total_tasks, completed_tasks = (
+        db.query(
+            func.count(models.KanbanTask.id),
+            func.count(models.KanbanTask.id).filter(
+                models.KanbanTask.completed == True
+            ),
+        )
         .join(models.KanbanColumn)
         .join(models.KanbanBoard)
         .filter(models.KanbanBoard.owner_id == user_id)
-        .scalar()
+        .one()
     )
-    
-    completed_tasks = (
-        db.query(func.count(models.KanbanTask.id))
-        .join(models.KanbanColumn)
-        .join(models.KanbanBoard)
-        .filter(
-            models.KanbanBoard.owner_id == user_id,
-            models.KanbanTask.completed == True,
+
+    return {"total": total_tasks or 0, "completed": completed_tasks or 0}
+
+
+def _attach_challenge_progress(
+    db: Session, challenges: List[models.Challenge]
+) -> List[models.Challenge]:
+    """Sets total_tasks/completed_tasks on challenges with one grouped query."""
+    if not challenges:
+        return challenges
+    association = models.challenge_tasks_association
+    rows = (
+        db.query(
+            association.c.challenge_id,
+            func.count(association.c.task_id),
+            func.count(models.KanbanTask.id).filter(
+                models.KanbanTask.completed == True
+            ),
         )
-        .scalar()
+        .select_from(association)
+        .outerjoin(models.KanbanTask, models.KanbanTask.id == association.c.task_id)
+        .filter(association.c.challenge_id.in_([c.id for c in challenges]))
+        .group_by(association.c.challenge_id)
+        .all()
     )
-    
-    return {"total": total_tasks or 0, "completed": completed_tasks or 0}
+    progress = {challenge_id: (total, done) for challenge_id, total, done in rows}
+    for challenge in challenges:
+        challenge.total_tasks, challenge.completed_tasks = progress.get(
+            challenge.id, (0, 0)
+        )
+    return challenges
+
 
 def get_challenge_by_id(db: Session, challenge_id: int, user_id: int) -> models.Challenge | None:
-    return (
+    db_challenge = (
         db.query(models.Challenge)
         .filter(models.Challenge.id == challenge_id, models.Challenge.user_id == user_id)
         .first()
     )
+    if db_challenge:
+        _attach_challenge_progress(db, [db_challenge])
+    return db_challenge
 
+@retry_on_locked
 def update_challenge(db: Session, db_challenge: models.Challenge, challenge_update: schemas.ChallengeUpdate) -> models.Challenge:
     update_data = challenge_update.dict(exclude_unset=True)
+    was_active = db_challenge.status == "active"
     for key, value in update_data.items():
         setattr(db_challenge, key, value)
     db.add(db_challenge)
+    _bump_progress(
+        db,
+        db_challenge.user_id,
+        active_challenges=int(db_challenge.status == "active") - int(was_active),
+    )
     db.commit()
     db.refresh(db_challenge)
+    _attach_challenge_progress(db, [db_challenge])
     return db_challenge
 
+@retry_on_locked
 def delete_challenge(db: Session, challenge_id: int, user_id: int) -> bool:
     db_challenge = db.query(models.Challenge).filter(
         models.Challenge.id == challenge_id, models.Challenge.user_id == user_id
     ).first()
     if db_challenge:
+        _record_tombstones(db, user_id, "challenges", [db_challenge.id])
         db.delete(db_challenge)
+        _bump_progress(
+            db, user_id, active_challenges=-int(db_challenge.status == "active")
+        )
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+
+def get_user_insight(db: Session, user_id: int) -> models.UserInsight | None:
+    return db.get(models.UserInsight, user_id)
+
+
+def _insert_or_update(db: Session, model, values: dict, updates: dict) -> None:
+    """INSERT ... ON CONFLICT (primary key) DO UPDATE, atomic unlike merge()."""
+    dialect_insert = (
+        postgresql.insert
+        if db.get_bind().dialect.name == "postgresql"
+        else sqlite.insert
+    )
+    db.execute(
+        dialect_insert(model)
+        .values(**values)
+        .on_conflict_do_update(
+            index_elements=[column.name for column in model.__table__.primary_key],
+            set_=updates,
+        )
+    )
+
+
+@retry_on_locked
+def save_user_insight(
+    db: Session, user_id: int, fingerprint: str, insight: schemas.AIPoweredInsight
+) -> models.UserInsight:
+    values = {
+        "fingerprint": fingerprint,
+        "insight_text": insight.insight_text,
+        "severity": insight.severity,
+        "generated_at": datetime.utcnow(),
+    }
+    _insert_or_update(db, models.UserInsight, {"user_id": user_id, **values}, values)
+    db.commit()
+    return db.get(models.UserInsight, user_id, populate_existing=True)
+
+
+def _pool_source_filter(source: schemas.QuestionPoolSource):
+    return and_(
+        models.PooledQuestion.source_type == source.source_type,
+        models.PooledQuestion.source_id == source.source_id,
+        models.PooledQuestion.week_number == source.week_number,
+    )
+
+
+def _pooled_questions(db: Session, owner_id: int, question_type: str, difficulty: str):
+    return db.query(models.PooledQuestion).filter(
+        models.PooledQuestion.owner_id == owner_id,
+        models.PooledQuestion.question_type == question_type,
+        models.PooledQuestion.difficulty == difficulty,
+    )
+
+
+def _normalize_question(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+@retry_on_locked
+def take_pooled_questions(
+    db: Session,
+    owner_id: int,
+    sources: List[schemas.QuestionPoolSource],
+    question_type: str,
+    difficulty: str,
+    limit: int,
+) -> tuple[List[dict], set]:
+    """Marks up to limit random unserved questions as served and returns them.
+
+    Also returns the (source_type, source_id, week_number) keys of the pools
+    the questions came from.
+    """
+    current_sources = or_(
+        *(
+            and_(
+                _pool_source_filter(source),
+                models.PooledQuestion.source_fingerprint == source.fingerprint,
+            )
+            for source in sources
+        )
+    )
+    candidate_ids = [
+        row.id
+        for row in _pooled_questions(db, owner_id, question_type, difficulty)
+        .filter(current_sources, models.PooledQuestion.served_at.is_(None))
+        .with_entities(models.PooledQuestion.id)
+        .order_by(func.random())
+        .limit(limit)
+    ]
+    if not candidate_ids:
+        return [], set()
+    # Re-checking served_at means a concurrent request that picked the same
+    # rows gets fewer questions rather than the same ones.
+    rows = db.execute(
+        update(models.PooledQuestion)
+        .where(
+            models.PooledQuestion.id.in_(candidate_ids),
+            models.PooledQuestion.served_at.is_(None),
+        )
+        .values(served_at=datetime.utcnow())
+        .returning(
+            models.PooledQuestion.payload,
+            models.PooledQuestion.source_type,
+            models.PooledQuestion.source_id,
+            models.PooledQuestion.week_number,
+        )
+    ).all()
+    db.commit()
+    return (
+        [json.loads(row.payload) for row in rows],
+        {(row.source_type, row.source_id, row.week_number) for row in rows},
+    )
+
+
+def count_unserved_questions(
+    db: Session,
+    owner_id: int,
+    source: schemas.QuestionPoolSource,
+    question_type: str,
+    difficulty: str,
+) -> int:
+    return (
+        _pooled_questions(db, owner_id, question_type, difficulty)
+        .filter(
+            _pool_source_filter(source),
+            models.PooledQuestion.source_fingerprint == source.fingerprint,
+            models.PooledQuestion.served_at.is_(None),
+        )
+        .count()
+    )
+
+
+@retry_on_locked
+def add_pooled_questions(
+    db: Session,
+    owner_id: int,
+    source: schemas.QuestionPoolSource,
+    question_type: str,
+    difficulty: str,
+    questions: List[dict],
+    served: bool = False,
+) -> int:
+    """Stores new questions for a source, skipping any it already had.
+
+    served=True records questions that were generated live and already sent,
+    so that a later refill can't store and serve them again.
+    """
+    # Questions from an older version of the source are never served again.
+    db.query(models.PooledQuestion).filter(
+        models.PooledQuestion.owner_id == owner_id,
+        _pool_source_filter(source),
+        models.PooledQuestion.source_fingerprint != source.fingerprint,
+    ).delete(synchronize_session=False)
+    # Served questions are kept so that regenerated duplicates are skipped.
+    seen = {
+        _normalize_question(question): (question_id, served_at)
+        for question_id, question, served_at in _pooled_questions(
+            db, owner_id, question_type, difficulty
+        )
+        .filter(_pool_source_filter(source))
+        .with_entities(
+            models.PooledQuestion.id,
+            models.PooledQuestion.question,
+            models.PooledQuestion.served_at,
+        )
+    }
+    served_at = datetime.utcnow() if served else None
+    now_served_ids = []
+    new_rows = []
+    for question in questions:
+        key = _normalize_question(question["question"])
+        if key in seen:
+            question_id, previously_served_at = seen[key]
+            if served and question_id is not None and previously_served_at is None:
+                now_served_ids.append(question_id)
+            continue
+        seen[key] = (None, served_at)
+        new_rows.append(
+            {
+                "owner_id": owner_id,
+                "source_type": source.source_type,
+                "source_id": source.source_id,
+                "week_number": source.week_number,
+                "question_type": question_type,
+                "difficulty": difficulty,
+                "source_fingerprint": source.fingerprint,
+                "question": question["question"],
+                "payload": json.dumps(question),
+                "served_at": served_at,
+            }
+        )
+    if now_served_ids:
+        db.query(models.PooledQuestion).filter(
+            models.PooledQuestion.id.in_(now_served_ids)
+        ).update({"served_at": served_at}, synchronize_session=False)
+    if new_rows:
+        db.execute(insert(models.PooledQuestion), new_rows)
+    db.commit()
+    return len(new_rows)
+
+
+def _delete_pooled_questions(
+    db: Session, owner_id: int, source_type: str, source_id: int
+) -> None:
+    db.query(models.PooledQuestion).filter(
+        models.PooledQuestion.owner_id == owner_id,
+        models.PooledQuestion.source_type == source_type,
+        models.PooledQuestion.source_id == source_id,
+    ).delete(synchronize_session=False)
+
+
+def rebuild_user_progress(db: Session, user_id: int) -> models.UserProgress:
+    """Recomputes a user's progress counters from the source rows."""
+    task_counts = get_task_counts_by_user(db, user_id=user_id)
+    quiz_attempts, quiz_score_total = (
+        db.query(
+            func.count(models.QuizAttempt.id),
+            func.coalesce(func.sum(models.QuizAttempt.score), 0),
+        )
+        .filter(models.QuizAttempt.user_id == user_id)
+        .one()
+    )
+    active_challenges = (
+        db.query(func.count(models.Challenge.id))
+        .filter(
+            models.Challenge.user_id == user_id, models.Challenge.status == "active"
+        )
+        .scalar()
+    )
+    counters = {
+        "total_tasks": task_counts["total"],
+        "completed_tasks": task_counts["completed"],
+        "quiz_attempts": quiz_attempts,
+        "quiz_score_total": quiz_score_total,
+        "active_challenges": active_challenges,
+    }
+    _insert_or_update(
+        db,
+        models.UserProgress,
+        {"user_id": user_id, **counters},
+        {
+            **counters,
+            "version": models.UserProgress.version + 1,
+            "updated_at": func.now(),
+        },
+    )
+    return db.get(models.UserProgress, user_id, populate_existing=True)
+
+
+def rebuild_all_user_progress(db: Session) -> int:
+    user_ids = [row[0] for row in db.query(models.User.id).all()]
+    for user_id in user_ids:
+        rebuild_user_progress(db, user_id)
+        db.commit()
+    return len(user_ids)
+
+
+def get_user_progress(db: Session, user_id: int) -> models.UserProgress:
+    progress = db.get(models.UserProgress, user_id)
+    if progress is None:
+        progress = rebuild_user_progress(db, user_id)
+        db.commit()
+    return progress
+
+
+def get_dashboard_state(
+    db: Session, user_id: int
+) -> tuple[models.UserProgress | None, models.UserInsight | None]:
+    """The progress row and the user's insight, in one primary-key lookup."""
+    row = (
+        db.query(models.UserProgress, models.UserInsight)
+        .outerjoin(
+            models.UserInsight, models.UserInsight.user_id == models.UserProgress.user_id
+        )
+        .filter(models.UserProgress.user_id == user_id)
+        .first()
+    )
+    return tuple(row) if row else (None, None)
+
+
+@retry_on_locked
+def save_dashboard_lists(db: Session, user_id: int, key: str, lists: str) -> None:
+    # Doesn't bump version: a write that raced the rebuild already did, so the
+    # key saved here is stale and the lists are rebuilt on the next load.
+    db.query(models.UserProgress).filter(
+        models.UserProgress.user_id == user_id
+    ).update(
+        {"dashboard_lists": lists, "dashboard_lists_key": key},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def _bump_progress(db: Session, user_id: int, **deltas: int) -> None:
+    """Applies counter deltas to user_progress inside the caller's transaction.
+
+    Also bumps its version, which invalidates the cached dashboard lists, so
+    writes that only change what those lists show call this without deltas.
+    The row is rebuilt from source rows instead if it does not exist yet, so
+    pending changes are flushed first to be counted exactly once.
+    """
+    values = {
+        getattr(models.UserProgress, key): getattr(models.UserProgress, key) + value
+        for key, value in deltas.items()
+        if value
+    }
+    values[models.UserProgress.version] = models.UserProgress.version + 1
+    db.flush()
+    updated = (
+        db.query(models.UserProgress)
+        .filter(models.UserProgress.user_id == user_id)
+        .update(values, synchronize_session=False)
+    )
+    if not updated:
+        rebuild_user_progress(db, user_id)
+
+
+def get_database_now(db: Session) -> datetime:
+    return db.scalar(select(func.now()))
+
+
+def sync_retention_cutoff(db: Session) -> datetime:
+    return get_database_now(db) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def _touch_task_challenges(db: Session, task_ids: List[int]) -> None:
+    """Marks challenges linked to the tasks as changed for /sync."""
+    if not task_ids:
+        return
+    association = models.challenge_tasks_association
+    db.execute(
+        update(models.Challenge)
+        .where(
+            models.Challenge.id.in_(
+                select(association.c.challenge_id).where(
+                    association.c.task_id.in_(task_ids)
+                )
+            )
+        )
+        .values(updated_at=models.change_time())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_sync_changes(db: Session, user_id: int, since: datetime | None) -> dict:
+    """Rows changed at or after ``since`` plus ids deleted since then.
+
+    With no ``since`` every row is returned and there are no deletions.
+    """
+
+    def changed(query, updated_at):
+        return query.filter(updated_at >= since).all() if since else query.all()
+
+    changes = {
+        "syllaby": changed(
+            db.query(models.Syllabus).filter(models.Syllabus.owner_id == user_id),
+            models.Syllabus.updated_at,
+        ),
+        "notes": changed(
+            db.query(models.Note)
+            .filter(models.Note.owner_id == user_id)
+            .options(
+                selectinload(models.Note.key_terms_rel),
+                selectinload(models.Note.flashcards_rel),
+            ),
+            models.Note.updated_at,
+        ),
+        "kanban_boards": changed(
+            db.query(models.KanbanBoard)
+            .filter(models.KanbanBoard.owner_id == user_id)
+            .options(selectinload(models.KanbanBoard.columns)),
+            models.KanbanBoard.updated_at,
+        ),
+        "kanban_tasks": changed(
+            db.query(models.KanbanTask)
+            .join(models.KanbanColumn)
+            .join(models.KanbanBoard)
+            .filter(models.KanbanBoard.owner_id == user_id),
+            models.KanbanTask.updated_at,
+        ),
+        "challenges": _attach_challenge_progress(
+            db,
+            changed(
+                db.query(models.Challenge).filter(models.Challenge.user_id == user_id),
+                models.Challenge.updated_at,
+            ),
+        ),
+        "deleted": {},
+    }
+    if since:
+        tombstones = db.query(
+            models.SyncTombstone.entity, models.SyncTombstone.entity_id
+        ).filter(
+            models.SyncTombstone.user_id == user_id,
+            models.SyncTombstone.deleted_at >= since,
+        )
+        for entity, entity_id in tombstones:
+            changes["deleted"].setdefault(entity, []).append(entity_id)
+    return changes
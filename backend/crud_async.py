@@ -0,0 +1,104 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+import models
+from pagination import (
+    DEFAULT_PAGE_SIZE,
+    NOTE_PAGE_KEY,
+    SYLLABUS_PAGE_KEY,
+    TASK_PAGE_KEY,
+    apply_keyset,
+    split_page,
+)
+from typing import List
+
+# Async variants of the read paths hit on every page load. Relationships that
+# the response schemas serialize are eager-loaded, since lazy loading is not
+# available once an AsyncSession hands the objects back.
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> models.User | None:
+    result = await db.execute(
+        select(models.User).where(models.User.username == username)
+    )
+    return result.scalars().first()
+
+
+async def get_syllaby_by_user(
+    db: AsyncSession,
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> tuple[list[models.Syllabus], str | None]:
+    stmt = select(models.Syllabus).where(models.Syllabus.owner_id == user_id)
+    stmt = apply_keyset(stmt, SYLLABUS_PAGE_KEY, cursor, limit, descending=True)
+    result = await db.execute(stmt)
+    return split_page(list(result.scalars().all()), SYLLABUS_PAGE_KEY, limit)
+
+
+async def get_notes_by_user(
+    db: AsyncSession,
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> tuple[list[models.Note], str | None]:
+    stmt = (
+        select(models.Note)
+        .where(models.Note.owner_id == user_id)
+        .options(
+            selectinload(models.Note.key_terms_rel),
+            selectinload(models.Note.flashcards_rel),
+        )
+    )
+    stmt = apply_keyset(stmt, NOTE_PAGE_KEY, cursor, limit, descending=True)
+    result = await db.execute(stmt)
+    return split_page(list(result.scalars().all()), NOTE_PAGE_KEY, limit)
+
+
+async def get_kanban_boards_by_user(
+    db: AsyncSession, user_id: int
+) -> List[models.KanbanBoard]:
+    result = await db.execute(
+        select(models.KanbanBoard)
+        .where(models.KanbanBoard.owner_id == user_id)
+        .options(
+            selectinload(models.KanbanBoard.columns).selectinload(
+                models.KanbanColumn.tasks
+            )
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def get_kanban_board(
+    db: AsyncSession, board_id: int, user_id: int
+) -> models.KanbanBoard | None:
+    result = await db.execute(
+        select(models.KanbanBoard)
+        .where(
+            models.KanbanBoard.id == board_id, models.KanbanBoard.owner_id == user_id
+        )
+        .options(
+            selectinload(models.KanbanBoard.columns).selectinload(
+                models.KanbanColumn.tasks
+            )
+        )
+    )
+    return result.scalars().first()
+
+
+async def get_all_tasks_by_user(
+    db: AsyncSession,
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> tuple[List[models.KanbanTask], str | None]:
+    stmt = (
+        select(models.KanbanTask)
+        .join(models.KanbanColumn)
+        .join(models.KanbanBoard)
+        .where(models.KanbanBoard.owner_id == user_id)
+    )
+    stmt = apply_keyset(stmt, TASK_PAGE_KEY, cursor, limit)
+    result = await db.execute(stmt)
+    return split_page(list(result.scalars().all()), TASK_PAGE_KEY, limit)
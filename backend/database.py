@@ -1,8 +1,15 @@
+import functools
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from fastapi import Depends
+from sqlalchemy import create_engine, event, inspect, make_url, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 load_dotenv()
 
@@ -14,12 +21,246 @@ if not SQLALCHEMY_DATABASE_URL:
         "Please ensure .env file exists and contains DATABASE_URL."
     )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+SQLALCHEMY_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_RETRY_SECONDS = int(os.getenv("DATABASE_REPLICA_RETRY_SECONDS", 30))
+
+POOL_SETTINGS = {
+    "pool_size": os.getenv("DB_POOL_SIZE"),
+    "max_overflow": os.getenv("DB_MAX_OVERFLOW"),
+    "pool_timeout": os.getenv("DB_POOL_TIMEOUT"),
+    "pool_recycle": os.getenv("DB_POOL_RECYCLE"),
+}
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "true").lower() in ("1", "true", "yes")
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 268435456)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),
+}
+SQLITE_WRITE_RETRIES = int(os.getenv("SQLITE_WRITE_RETRIES", 5))
+SQLITE_RETRY_BACKOFF_SECONDS = float(os.getenv("SQLITE_RETRY_BACKOFF_SECONDS", 0.05))
+# Total time one retried write may spend waiting on locks and backing off.
+SQLITE_WRITE_DEADLINE_SECONDS = float(os.getenv("SQLITE_WRITE_DEADLINE_SECONDS", 5))
+
+pool_metrics = {}
+_pool_metrics_lock = threading.Lock()
+
+
+def _record_checkout(name: str, wait_seconds: float, timed_out: bool) -> None:
+    with _pool_metrics_lock:
+        stats = pool_metrics.setdefault(
+            name,
+            {"checkouts": 0, "timeouts": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0},
+        )
+        wait_ms = wait_seconds * 1000
+        stats["checkouts"] += 1
+        stats["timeouts"] += int(timed_out)
+        stats["total_wait_ms"] += wait_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            _record_checkout(self.metrics_name, time.perf_counter() - start, timed_out)
+
+
+def _uses_queue_pool(url: str) -> bool:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return True
+    return parsed.database not in (None, "", ":memory:")
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def apply_sqlite_profile(db_engine, in_memory: bool = False) -> None:
+    pragmas = dict(SQLITE_PRAGMAS)
+    if in_memory:
+        pragmas.pop("journal_mode")
+        pragmas.pop("mmap_size")
+
+    @event.listens_for(db_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _limit_busy_timeout(db: Session, seconds: float) -> None:
+    """Caps busy_timeout on the session's connection until it is checked in."""
+    connection = db.connection()
+    info = connection.connection.info
+    if "busy_timeout_ms" not in info:
+        info["busy_timeout_ms"] = connection.exec_driver_sql(
+            "PRAGMA busy_timeout"
+        ).scalar()
+    timeout_ms = max(0, int(seconds * 1000))
+    if timeout_ms < info["busy_timeout_ms"]:
+        connection.exec_driver_sql(f"PRAGMA busy_timeout={timeout_ms}")
+        info["busy_timeout_lowered"] = True
+
+
+def _restore_busy_timeout(dbapi_connection, connection_record) -> None:
+    if not connection_record.info.pop("busy_timeout_lowered", False):
+        return
+    if dbapi_connection is not None:
+        timeout_ms = connection_record.info["busy_timeout_ms"]
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={timeout_ms}")
+        cursor.close()
+
+
+def _make_engine(url: str, name: str):
+    kwargs = {"pool_pre_ping": True}
+    if _uses_queue_pool(url):
+        kwargs["poolclass"] = type(
+            f"{name.title()}TimedQueuePool", (TimedQueuePool,), {"metrics_name": name}
+        )
+        kwargs.update(
+            {key: int(value) for key, value in POOL_SETTINGS.items() if value}
+        )
+    db_engine = create_engine(url, **kwargs)
+    if _is_sqlite(url):
+        event.listen(db_engine, "checkin", _restore_busy_timeout)
+        if SQLITE_PROFILE:
+            apply_sqlite_profile(db_engine, in_memory=not _uses_queue_pool(url))
+    return db_engine
+
+
+engine = _make_engine(SQLALCHEMY_DATABASE_URL, "primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engine = None
+ReplicaSessionLocal = None
+_replica_down_until = 0.0
+
+if SQLALCHEMY_REPLICA_URL:
+    replica_engine = _make_engine(SQLALCHEMY_REPLICA_URL, "replica")
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=replica_engine
+    )
+
 Base = declarative_base()
 
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _to_async_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(
+        SQLALCHEMY_DATABASE_URL
+    )
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+    if SQLITE_PROFILE and _is_sqlite(ASYNC_DATABASE_URL):
+        apply_sqlite_profile(
+            async_engine.sync_engine, in_memory=not _uses_queue_pool(ASYNC_DATABASE_URL)
+        )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+def _is_lock_error(error: OperationalError) -> bool:
+    return "locked" in str(error.orig).lower()
+
+
+def retry_on_locked(func):
+    """Retries a short SQLite write transaction that failed on a held lock.
+
+    The wrapped function must take the Session as its first argument (or as
+    ``db``) and own its transaction, since the session is rolled back before
+    each retry. Lock waits and backoff together stay within
+    SQLITE_WRITE_DEADLINE_SECONDS. Other databases run the function unchanged.
+    """
+    if not _is_sqlite(SQLALCHEMY_DATABASE_URL):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        db = kwargs["db"] if "db" in kwargs else args[0]
+        deadline = time.monotonic() + SQLITE_WRITE_DEADLINE_SECONDS
+        for attempt in range(SQLITE_WRITE_RETRIES + 1):
+            _limit_busy_timeout(db, deadline - time.monotonic())
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if not _is_lock_error(e) or attempt == SQLITE_WRITE_RETRIES:
+                    raise
+                db.rollback()
+                delay = SQLITE_RETRY_BACKOFF_SECONDS * (2**attempt)
+                pause = delay + random.uniform(0, delay)
+                if pause >= deadline - time.monotonic():
+                    raise
+                time.sleep(pause)
+
+    return wrapper
+
+
+def upgrade_existing_tables(db_engine, metadata) -> None:
+    """Adds columns and indexes that create_all() skips on tables that exist.
+
+    New columns are added as plain nullable columns; their ORM defaults fill
+    them in for rows written from then on. A constant server default is kept,
+    so existing rows get it too.
+    """
+    inspector = inspect(db_engine)
+    with db_engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=db_engine.dialect)
+                default = ""
+                if column.server_default is not None and isinstance(
+                    column.server_default.arg, str
+                ):
+                    default = f" DEFAULT '{column.server_default.arg}'"
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                        f"{column_type}{default}"
+                    )
+                )
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
 
 def get_db():
     db = SessionLocal()
@@ -27,3 +268,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(db: Session = Depends(get_db)):
+    global _replica_down_until
+    if ReplicaSessionLocal is None or time.monotonic() < _replica_down_until:
+        yield db
+        return
+    replica_db = ReplicaSessionLocal()
+    try:
+        replica_db.connection()
+    except OperationalError as e:
+        replica_db.close()
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        print(f"WARNING: Read replica unavailable, falling back to primary: {e}")
+        yield db
+        return
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
+
+def get_pool_metrics() -> dict:
+    engines = {"primary": engine, "replica": replica_engine}
+    report = {}
+    for name, db_engine in engines.items():
+        if db_engine is None:
+            continue
+        with _pool_metrics_lock:
+            stats = dict(pool_metrics.get(name, {}))
+        checkouts = stats.get("checkouts", 0)
+        stats["avg_wait_ms"] = (
+            round(stats["total_wait_ms"] / checkouts, 3) if checkouts else 0.0
+        )
+        for key in ("total_wait_ms", "max_wait_ms"):
+            if key in stats:
+                stats[key] = round(stats[key], 3)
+        stats["status"] = db_engine.pool.status()
+        report[name] = stats
+    return report
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
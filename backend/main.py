@@ -1,5 +1,10 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
 import os
 import random
+import threading
+import time
 from typing import Any, Dict, List, Optional, Tuple
 import uuid
 from pydantic import ValidationError
@@ -9,17 +14,55 @@ import re
 from dotenv import load_dotenv
 from fuzzywuzzy import fuzz
 from datetime import datetime, timezone, timedelta
-from fastapi import FastAPI, Depends, HTTPException, status, Path, Response
+from fastapi import (
+    BackgroundTasks,
+    FastAPI,
+    Depends,
+    HTTPException,
+    status,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import MutableHeaders
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-import models, schemas, crud, auth, database
+import models, schemas, crud, crud_async, auth, database
+from board_events import hub as board_event_hub
+from ollama_stream import StreamStop, post_stream
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from prompt_budget import (
+    build_prompt,
+    configured_context_tokens,
+    fit_messages,
+    output_reserve,
+    split_into_chunks,
+)
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 load_dotenv()
 
 chat_sessions = {}
-freeform_question_cache = {}
+insight_refreshes_in_flight = set()
+question_pool_refills_in_flight = set()
+ai_generation_metrics = {
+    "generated_tokens": 0,
+    "abandoned_requests": 0,
+    "wasted_tokens": 0,
+}
+ai_generation_metrics_lock = threading.Lock()
 
 app = FastAPI(
     title="Syllaby Backend API",
@@ -30,6 +73,50 @@ app = FastAPI(
 OLLAMA_API_BASE_URL = os.getenv("OLLAMA_API_BASE_URL")
 OLLAMA_MODEL_NAME = os.getenv("OLLAMA_MODEL_NAME")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", 300))
+INSIGHT_TTL_MINUTES = int(os.getenv("INSIGHT_TTL_MINUTES", 360))
+SYNC_OVERLAP_SECONDS = int(os.getenv("SYNC_OVERLAP_SECONDS", 5))
+AI_DISCONNECT_POLL_SECONDS = float(os.getenv("AI_DISCONNECT_POLL_SECONDS", 0.5))
+
+# Total time budget shared by all Ollama calls of one AI request. Retries and
+# optional steps (kanban generation, distractors, key terms, flashcards) only
+# start while at least AI_MIN_STEP_SECONDS of it remain; otherwise the endpoint
+# returns what it has with partial=true.
+AI_DEADLINE_SECONDS = float(os.getenv("AI_DEADLINE_SECONDS", REQUEST_TIMEOUT))
+AI_SYLLABUS_DEADLINE_SECONDS = float(
+    os.getenv("AI_SYLLABUS_DEADLINE_SECONDS", 2 * REQUEST_TIMEOUT)
+)
+AI_MIN_STEP_SECONDS = float(os.getenv("AI_MIN_STEP_SECONDS", 30))
+# Long notes are summarized and mined for terms and flashcards chunk by chunk,
+# with up to AI_MAP_CONCURRENCY chunk calls in flight per request.
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", 2048))
+AI_MAP_CONCURRENCY = int(os.getenv("AI_MAP_CONCURRENCY", 4))
+# Quiz and freeform questions are served from a pool per source (syllabus week
+# or note), question type and difficulty. A shortfall is generated live from up
+# to QUESTION_POOL_SAMPLE_SOURCES sampled sources; afterwards at most that many
+# of the pools the request drew from or sampled are topped up in the background
+# if below the low-water mark, with QUESTION_POOL_REFILL_CONCURRENCY refills
+# running at a time across all requests.
+QUESTION_POOL_LOW_WATER = int(os.getenv("QUESTION_POOL_LOW_WATER", 5))
+QUESTION_POOL_BATCH_SIZE = int(os.getenv("QUESTION_POOL_BATCH_SIZE", 5))
+QUESTION_POOL_SAMPLE_SOURCES = int(os.getenv("QUESTION_POOL_SAMPLE_SOURCES", 3))
+QUESTION_POOL_REFILL_CONCURRENCY = int(
+    os.getenv("QUESTION_POOL_REFILL_CONCURRENCY", 1)
+)
+question_pool_refill_slots = asyncio.Semaphore(QUESTION_POOL_REFILL_CONCURRENCY)
+FREEFORM_QUESTION_TTL_SECONDS = float(os.getenv("FREEFORM_QUESTION_TTL_SECONDS", 3600))
+FREEFORM_QUESTION_CACHE_MAX_SIZE = int(
+    os.getenv("FREEFORM_QUESTION_CACHE_MAX_SIZE", 10000)
+)
+
+# Per-route Cache-Control for conditional GETs. Responses are per-user, so they
+# are private, and no-cache makes the browser revalidate with If-None-Match.
+SYLLABUS_CACHE_CONTROL = os.getenv("SYLLABUS_CACHE_CONTROL", "private, no-cache")
+BOARD_CACHE_CONTROL = os.getenv("BOARD_CACHE_CONTROL", "private, no-cache")
+BOARD_EVENTS_KEEPALIVE_SECONDS = int(os.getenv("BOARD_EVENTS_KEEPALIVE_SECONDS", 15))
+
+# Bodies under this many bytes are sent uncompressed; compressing them costs
+# more CPU than the bytes it saves.
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1000))
 
 if not OLLAMA_API_BASE_URL or not OLLAMA_MODEL_NAME:
     raise ValueError(
@@ -37,6 +124,7 @@ if not OLLAMA_API_BASE_URL or not OLLAMA_MODEL_NAME:
     )
 
 models.Base.metadata.create_all(bind=database.engine)
+database.upgrade_existing_tables(database.engine, models.Base.metadata)
 
 origins = [
     "http://localhost:5173",
@@ -48,22 +136,169 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Brotli when brotli-asgi is installed (it falls back to gzip for clients that
+# don't accept br), plain gzip otherwise.
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+
+
+class EncodedETagMiddleware:
+    """Appends the content-encoding to the strong ETag of compressed responses.
+
+    The compression middleware changes the bytes on the wire but keeps the
+    route's tag, and a strong ETag has to differ between the identity and the
+    gzip/br bodies. _conditional_get strips the suffix again before comparing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                etag = headers.get("etag")
+                encoding = headers.get("content-encoding")
+                if etag and encoding and etag.startswith('"'):
+                    headers["etag"] = f'{etag[:-1]}-{encoding}"'
+                    message["headers"] = headers.raw
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+# Added after the compression middleware so that it wraps it and sees the
+# final Content-Encoding.
+app.add_middleware(EncodedETagMiddleware)
+
+
+class ClientDisconnected(BaseException):
+    """Raised when the client of an AI endpoint has gone away.
+
+    A BaseException, like asyncio.CancelledError, so that it gets past the
+    endpoints' broad `except Exception` handlers and skips remaining sub-calls.
+    """
+
+
+class AbandonedRequestMiddleware:
+    """Ends requests whose AI calls were cancelled because the client left."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        except ClientDisconnected:
+            pass
+
+
+app.add_middleware(AbandonedRequestMiddleware)
+
+# List endpoints keep returning a plain JSON array; the cursor for the next
+# page, if any, travels in the X-Next-Cursor header.
+PageLimit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)}
+    )
+
+
+def _etag(*version) -> str:
+    # EncodedETagMiddleware adds an encoding suffix when the body is compressed.
+    return '"%s"' % hashlib.sha256(repr(version).encode()).hexdigest()[:32]
+
+
+def _conditional_get(
+    request: Request, response: Response, etag: str, cache_control: str
+) -> Optional[Response]:
+    """Returns a 304 if If-None-Match matches, else tags the outgoing response."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match", "")
+    # If-None-Match uses weak comparison, and proxies may weaken the tag. The
+    # 304 repeats the matched tag, encoding suffix included, since that is the
+    # tag the client's cached copy carries.
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag == "*" or re.sub(r'-[a-z]+"$', '"', tag) == etag:
+            if tag != "*":
+                headers["ETag"] = tag
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _page_items(response: Response, page: Tuple[list, Optional[str]]) -> list:
+    items, next_cursor = page
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+class AIDeadlineExceeded(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The AI service could not finish within the request's time budget.",
+        )
+
+
+class OllamaUsage:
+    """Cancellation flag, deadline and token count shared by one request's calls."""
+
+    def __init__(self, budget_seconds: float = AI_DEADLINE_SECONDS):
+        self.cancelled = threading.Event()
+        self.deadline = time.monotonic() + budget_seconds
+        self.generated_tokens = 0
+        self.abandoned = False
+        self.partial = False
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+def _count_ai_generation(**deltas: int) -> None:
+    with ai_generation_metrics_lock:
+        for key, delta in deltas.items():
+            ai_generation_metrics[key] += delta
+
 
 def call_ollama(
     prompt: Optional[str] = None,
     model_name: str = OLLAMA_MODEL_NAME,
     num_predict: int = 4096,
     messages: Optional[List[schemas.ChatMessage]] = None,
+    usage: Optional[OllamaUsage] = None,
+    stop: Optional[StreamStop] = None,
 ) -> str:
     api_endpoint = "/api/chat" if messages else "/api/generate"
 
+    # Streamed so that a stopped call can close the connection, which makes
+    # Ollama stop generating; stop.set() aborts it even before the first token.
     ollama_payload = {
         "model": model_name,
-        "stream": False,
-        "options": {"num_predict": num_predict},
+        "stream": True,
+        # Prompts leave this much of the context for the answer.
+        "options": {"num_predict": output_reserve(num_predict, model_name)},
     }
+    # Only override the server's context size when one is configured here.
+    num_ctx = configured_context_tokens(model_name)
+    if num_ctx is not None:
+        ollama_payload["options"]["num_ctx"] = num_ctx
 
     if messages:
         ollama_payload["messages"] = [msg.dict() for msg in messages]
@@ -74,26 +309,66 @@ def call_ollama(
             "Either a 'prompt' or 'messages' must be provided to call Ollama."
         )
 
+    usage = usage or OllamaUsage()
+    stop = stop or StreamStop()
+    if usage.remaining() <= 0:
+        usage.partial = True
+        raise AIDeadlineExceeded()
+    pieces = []
     try:
-        ollama_response = requests.post(
+        with post_stream(
             f"{OLLAMA_API_BASE_URL}{api_endpoint}",
+            stop,
             json=ollama_payload,
-            timeout=REQUEST_TIMEOUT,
-        )
-        ollama_response.raise_for_status()
-        response_data = ollama_response.json()
-
-        if "message" in response_data and "content" in response_data["message"]:
-            generated_content = response_data["message"]["content"].strip()
-        elif "response" in response_data:
-            generated_content = response_data["response"].strip()
-        else:
-            raise ValueError("Ollama model returned an unexpected response format.")
+            timeout=min(REQUEST_TIMEOUT, usage.remaining()),
+        ) as ollama_response:
+            ollama_response.raise_for_status()
+            for line in ollama_response.iter_lines():
+                stopped = usage.cancelled.is_set() or stop.is_set()
+                if stopped or usage.remaining() <= 0:
+                    usage.generated_tokens += len(pieces)
+                    _count_ai_generation(generated_tokens=len(pieces))
+                    if stopped:
+                        raise ClientDisconnected()
+                    usage.partial = True
+                    raise AIDeadlineExceeded()
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise ValueError(f"Ollama returned an error: {chunk['error']}")
+                if "message" in chunk and "content" in chunk["message"]:
+                    pieces.append(chunk["message"]["content"])
+                elif "response" in chunk:
+                    pieces.append(chunk["response"])
+                else:
+                    raise ValueError(
+                        "Ollama model returned an unexpected response format."
+                    )
+                if chunk.get("done"):
+                    tokens = chunk.get("eval_count", len(pieces))
+                    usage.generated_tokens += tokens
+                    _count_ai_generation(generated_tokens=tokens)
+                    break
 
+        generated_content = "".join(pieces).strip()
         if not generated_content:
             raise ValueError("Ollama model returned empty content.")
         return generated_content
+    except requests.exceptions.Timeout:
+        if usage.remaining() <= 0:
+            usage.partial = True
+            raise AIDeadlineExceeded()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Timed out waiting for the Ollama service.",
+        )
     except requests.exceptions.RequestException as e:
+        if usage.cancelled.is_set() or stop.is_set():
+            # stop.set() shut the socket down under a blocked read.
+            usage.generated_tokens += len(pieces)
+            _count_ai_generation(generated_tokens=len(pieces))
+            raise ClientDisconnected()
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Failed to connect to Ollama service: {e}. Please ensure Ollama is running.",
@@ -104,6 +379,80 @@ def call_ollama(
         )
 
 
+def _abandon_generation(usage: OllamaUsage) -> ClientDisconnected:
+    usage.cancelled.set()
+    if not usage.abandoned:
+        usage.abandoned = True
+        _count_ai_generation(
+            abandoned_requests=1, wasted_tokens=usage.generated_tokens
+        )
+    return ClientDisconnected()
+
+
+def _request_usage(request: Request) -> OllamaUsage:
+    usage = getattr(request.state, "ollama_usage", None)
+    if usage is None:
+        usage = request.state.ollama_usage = OllamaUsage()
+    return usage
+
+
+def ai_deadline(budget_seconds: float):
+    """Route dependency that starts the request's AI budget with a custom total."""
+
+    async def start_ai_budget(request: Request) -> None:
+        request.state.ollama_usage = OllamaUsage(budget_seconds)
+
+    return start_ai_budget
+
+
+def ai_budget_allows(
+    request: Request, min_seconds: float = AI_MIN_STEP_SECONDS
+) -> bool:
+    """Whether an optional step or retry still fits; if not the result is partial."""
+    usage = _request_usage(request)
+    if usage.remaining() < min_seconds:
+        usage.partial = True
+        return False
+    return True
+
+
+def ai_result_partial(request: Request) -> bool:
+    return _request_usage(request).partial
+
+
+async def call_ollama_for_request(request: Request, *args, **kwargs) -> str:
+    """Runs call_ollama off the event loop and cancels it if the client leaves.
+
+    All calls for one request share an OllamaUsage on request.state, so they
+    draw on one deadline, and once a disconnect is seen the in-flight call
+    stops and later sub-calls never start. Cancelling the awaiting task stops
+    just this call's stream.
+    """
+    usage = _request_usage(request)
+    if usage.cancelled.is_set() or await request.is_disconnected():
+        raise _abandon_generation(usage)
+
+    stop = StreamStop()
+    call = asyncio.ensure_future(
+        run_in_threadpool(call_ollama, *args, usage=usage, stop=stop, **kwargs)
+    )
+    try:
+        while not call.done():
+            await asyncio.wait({call}, timeout=AI_DISCONNECT_POLL_SECONDS)
+            if not call.done() and await request.is_disconnected():
+                usage.cancelled.set()
+                stop.set()
+    except asyncio.CancelledError:
+        stop.set()
+        # Nobody reads the stopped call's outcome.
+        call.add_done_callback(lambda call: call.cancelled() or call.exception())
+        raise
+    try:
+        return call.result()
+    except ClientDisconnected:
+        raise _abandon_generation(usage)
+
+
 def _extract_and_parse_json(raw_text: str, expected_type: type = dict) -> Any:
     json_match = re.search(r"```json\s*([\s\S]*?)\s*```", raw_text)
     if json_match:
@@ -138,23 +487,53 @@ async def read_root():
     }
 
 
+@app.get("/metrics/db-pool", dependencies=[Depends(auth.require_metrics_token)])
+async def read_db_pool_metrics():
+    return database.get_pool_metrics()
+
+
+@app.get("/metrics/ai", dependencies=[Depends(auth.require_metrics_token)])
+async def read_ai_metrics():
+    with ai_generation_metrics_lock:
+        return dict(ai_generation_metrics)
+
+
+USER_UNIQUE_FIELDS = {
+    "username": "Username already registered",
+    "email": "Email already registered",
+}
+
+
+def _duplicate_user_detail(error: IntegrityError) -> Optional[str]:
+    # Matches the violated column or index name in both the SQLite
+    # ("users.email") and PostgreSQL ("ix_users_email", "Key (email)") messages.
+    message = str(error.orig).lower()
+    for field, detail in USER_UNIQUE_FIELDS.items():
+        if any(
+            marker in message
+            for marker in (f"users.{field}", f"ix_users_{field}", f"({field})")
+        ):
+            return detail
+    return None
+
+
 @app.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user: schemas.UserCreate, db: Session = Depends(database.get_db)
 ):
-    db_user = crud.get_user_by_username(db, username=user.username)
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered",
-        )
-    db_user_email = crud.get_user_by_email(db, email=user.email)
-    if db_user_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
+    # The unique constraints on username and email decide duplicates in the
+    # INSERT itself, so there is no lookup to race between.
+    hashed_password = await auth.get_password_hash_async(user.password)
+    try:
+        return await run_in_threadpool(
+            crud.create_user, db=db, user=user, hashed_password=hashed_password
         )
-    return crud.create_user(db=db, user=user)
+    except IntegrityError as e:
+        db.rollback()
+        detail = _duplicate_user_detail(e)
+        if detail is None:
+            raise
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
 
 @app.post("/token", response_model=schemas.Token)
@@ -163,15 +542,26 @@ async def login_for_access_token(
     db: Session = Depends(database.get_db),
 ):
     user = crud.get_user_by_username_or_email(db, identifier=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = (False, None)
+    if user:
+        username, hashed_password = user.username, user.hashed_password
+        # Return the connection to the pool while bcrypt runs so a burst of
+        # logins cannot exhaust it.
+        db.rollback()
+        verified, new_hash = await auth.verify_and_update_password_async(
+            form_data.password, hashed_password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username, email, or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await run_in_threadpool(crud.update_user_password_hash, db, user, new_hash)
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": username}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -183,8 +573,8 @@ async def read_users_me(current_user: schemas.User = Depends(auth.get_current_us
 
 @app.get("/homepage-data", response_model=schemas.HomePageData)
 async def get_homepage_data(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
 ):
     original_data = {
         "message": f"Welcome to your Syllaby homepage, {current_user.username}!",
@@ -225,14 +615,18 @@ async def get_homepage_data(
 
 
 @app.post(
-    "/syllaby", response_model=schemas.Syllabus, status_code=status.HTTP_201_CREATED
+    "/syllaby",
+    response_model=schemas.SyllabusCreateOutput,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ai_deadline(AI_SYLLABUS_DEADLINE_SECONDS))],
 )
 async def create_syllaby_endpoint(
+    request: Request,
     syllaby: schemas.SyllabusCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    prompt = f"""
+    render_prompt = lambda outline: f"""
     You are Syllaby AI, an expert at creating structured, day-by-day study plans.
     Your task is to transform a user's raw course outline into a detailed, structured JSON object.
     
@@ -267,18 +661,31 @@ async def create_syllaby_endpoint(
     --- USER INPUT ---
     Course Title: {syllaby.title}
     Course Code: {syllaby.course_code or 'N/A'}
-    Raw Course Outline: {syllaby.raw_input_outline}
+    Raw Course Outline: {outline}
     Total Duration: {syllaby.duration} {syllaby.unit}
     --- END USER INPUT ---
     Your entire response is the JSON object:
     """
+    prompt = build_prompt(
+        "syllabus",
+        render_prompt,
+        num_predict=16384,
+        outline=syllaby.raw_input_outline,
+    )
 
     max_retries = 3
     last_error = None
+    cleaned_json_string = None
 
+    attempts = 0
     for attempt in range(max_retries):
+        if attempt and not ai_budget_allows(request):
+            break
+        attempts += 1
         try:
-            raw_ai_response = call_ollama(prompt, num_predict=16384)
+            raw_ai_response = await call_ollama_for_request(
+                request, prompt, num_predict=16384
+            )
             parsed_json = _extract_and_parse_json(raw_ai_response)
             cleaned_json_string = json.dumps(parsed_json)
             break
@@ -291,9 +698,11 @@ async def create_syllaby_endpoint(
             continue
 
     if not cleaned_json_string:
+        if ai_result_partial(request):
+            raise AIDeadlineExceeded()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"The AI failed to generate a valid syllabus structure after {max_retries} attempts. Please try again. Error: {last_error}",
+            detail=f"The AI failed to generate a valid syllabus structure after {attempts} attempts. Please try again. Error: {last_error}",
         )
 
     db_syllaby = crud.create_user_syllaby(
@@ -304,21 +713,42 @@ async def create_syllaby_endpoint(
     )
 
     try:
-        kanban_prompt = f"""
+        if not ai_budget_allows(request):
+            raise AIDeadlineExceeded()
+        # Only the daily tasks are needed here; sending the whole plan again
+        # (objectives, resources, ...) roughly triples the prompt.
+        weekly_tasks = [
+            json.dumps(
+                {
+                    "week_number": week.get("week_number"),
+                    "daily_tasks": week.get("daily_tasks", []),
+                }
+            )
+            for week in parsed_json.get("weeks", [])
+            if isinstance(week, dict)
+        ]
+        kanban_prompt = build_prompt(
+            "syllabus kanban",
+            lambda daily_tasks: f"""
         You are an AI expert at creating actionable project plans.
-        You will be given a JSON object representing a study plan.
+        You will be given the daily tasks of a study plan, one JSON object per week.
         YOUR TASK:
         Analyze the `daily_tasks` for all weeks.
         From this analysis, generate a single, consolidated list of the most important, actionable "to-do" items.
         STRICT OUTPUT RULES:
         - The output MUST be a JSON array of strings.
         - Output ONLY the JSON array. Do not add explanations or markdown.
-        --- FULL STUDY PLAN JSON ---
-        {cleaned_json_string}
-        --- END STUDY PLAN JSON ---
+        --- STUDY PLAN DAILY TASKS ---
+        {daily_tasks}
+        --- END STUDY PLAN DAILY TASKS ---
         CONSOLIDATED TASKS (JSON array of strings ONLY):
-        """
-        raw_kanban_response = call_ollama(kanban_prompt, num_predict=4096)
+        """,
+            num_predict=4096,
+            daily_tasks=weekly_tasks,
+        )
+        raw_kanban_response = await call_ollama_for_request(
+            request, kanban_prompt, num_predict=4096
+        )
         task_titles = _extract_and_parse_json(raw_kanban_response, expected_type=list)
 
         if not isinstance(task_titles, list) or not all(
@@ -336,35 +766,43 @@ async def create_syllaby_endpoint(
         crud.create_kanban_board_from_ai(
             db=db, syllabus_id=db_syllaby.id, ai_kanban_data=kanban_data
         )
-    except (json.JSONDecodeError, ValueError, KeyError) as e:
+    except (json.JSONDecodeError, ValueError, KeyError, AIDeadlineExceeded) as e:
         print(
             f"WARNING: Failed to auto-generate Kanban board for syllabus {db_syllaby.id}: {e}"
         )
 
     db.refresh(db_syllaby)
-    return db_syllaby
+    return schemas.SyllabusCreateOutput.model_validate(db_syllaby).model_copy(
+        update={"partial": ai_result_partial(request)}
+    )
 
 
 @app.get("/syllaby", response_model=list[schemas.Syllabus])
 async def read_syllaby_list(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    async_db: AsyncSession | None = Depends(database.get_async_db),
+    cursor: Optional[str] = None,
+    limit: int = PageLimit,
 ):
-    return crud.get_syllaby_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-
+    if async_db is not None:
+        page = await crud_async.get_syllaby_by_user(
+            async_db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    else:
+        page = crud.get_syllaby_by_user(
+            db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    return _page_items(response, page)
 
-@app.get("/syllaby/{syllaby_id}", response_model=schemas.SyllabusDetail)
-async def read_syllaby(
-    syllaby_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
-):
-    db_syllaby = crud.get_syllaby(db, syllaby_id=syllaby_id)
-    if db_syllaby is None or db_syllaby.owner_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Syllaby not found")
 
+def _syllabus_detail(
+    db_syllaby: models.Syllabus, include_raw: bool = False
+) -> schemas.SyllabusDetail:
+    # weeks/introduction already carry the parsed plan, so the raw JSON string
+    # is only sent back to clients that ask for it (the editor).
+    raw_content = db_syllaby.generated_content if include_raw else None
     try:
         structured_data = json.loads(db_syllaby.generated_content)
 
@@ -380,7 +818,7 @@ async def read_syllaby(
             title=db_syllaby.title,
             course_code=db_syllaby.course_code,
             raw_input_outline=db_syllaby.raw_input_outline,
-            generated_content=db_syllaby.generated_content,
+            generated_content=raw_content,
             owner_id=db_syllaby.owner_id,
             created_at=db_syllaby.created_at,
             updated_at=db_syllaby.updated_at,
@@ -392,7 +830,7 @@ async def read_syllaby(
 
     except (json.JSONDecodeError, ValidationError) as e:
         print(
-            f"WARNING: Syllabus {syllaby_id} has corrupted content. Sending fallback response. Error: {e}"
+            f"WARNING: Syllabus {db_syllaby.id} has corrupted content. Sending fallback response. Error: {e}"
         )
 
         return schemas.SyllabusDetail(
@@ -400,7 +838,7 @@ async def read_syllaby(
             title=db_syllaby.title,
             course_code=db_syllaby.course_code,
             raw_input_outline=db_syllaby.raw_input_outline,
-            generated_content=db_syllaby.generated_content,
+            generated_content=raw_content,
             owner_id=db_syllaby.owner_id,
             created_at=db_syllaby.created_at,
             updated_at=db_syllaby.updated_at,
@@ -410,17 +848,50 @@ async def read_syllaby(
         )
 
 
-@app.post("/syllaby/{syllaby_id}/regenerate", response_model=schemas.SyllabusDetail)
+@app.get("/syllaby/{syllaby_id}", response_model=schemas.SyllabusDetail)
+async def read_syllaby(
+    syllaby_id: int,
+    request: Request,
+    response: Response,
+    include_raw: bool = False,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+):
+    version = crud.get_syllaby_version(
+        db, syllaby_id=syllaby_id, user_id=current_user.id
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Syllaby not found")
+    # The date is part of the tag because current_week_number depends on it.
+    etag = _etag(
+        "syllaby", syllaby_id, *version, datetime.now(timezone.utc).date(), include_raw
+    )
+    not_modified = _conditional_get(request, response, etag, SYLLABUS_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    db_syllaby = crud.get_syllaby(db, syllaby_id=syllaby_id)
+    if db_syllaby is None:
+        raise HTTPException(status_code=404, detail="Syllaby not found")
+    return _syllabus_detail(db_syllaby, include_raw)
+
+
+@app.post(
+    "/syllaby/{syllaby_id}/regenerate",
+    response_model=schemas.SyllabusDetail,
+    dependencies=[Depends(ai_deadline(AI_SYLLABUS_DEADLINE_SECONDS))],
+)
 async def regenerate_syllaby_content(
+    request: Request,
     syllaby_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_syllaby = crud.get_syllaby(db, syllaby_id=syllaby_id)
     if db_syllaby is None or db_syllaby.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Syllaby not found")
 
-    prompt = f"""
+    render_prompt = lambda outline: f"""
     You are Syllaby AI, an expert at creating structured, day-by-day study plans.
     Your task is to transform a user's raw course outline into a detailed, structured JSON object.
     
@@ -447,14 +918,24 @@ async def regenerate_syllaby_content(
     --- USER INPUT ---
     Course Title: {db_syllaby.title}
     Course Code: {db_syllaby.course_code or 'N/A'}
-    Raw Course Outline: {db_syllaby.raw_input_outline}
+    Raw Course Outline: {outline}
     Total Duration: {db_syllaby.duration} {db_syllaby.unit}
     --- END USER INPUT ---
     Your entire response is the JSON object:
     """
+    prompt = build_prompt(
+        "syllabus regenerate",
+        render_prompt,
+        num_predict=16384,
+        outline=db_syllaby.raw_input_outline,
+    )
+    # Release the pooled connection while the model runs.
+    db.rollback()
 
     try:
-        raw_ai_response = call_ollama(prompt, num_predict=16384)
+        raw_ai_response = await call_ollama_for_request(
+            request, prompt, num_predict=16384
+        )
         new_content_obj = _extract_and_parse_json(raw_ai_response)
         new_content = json.dumps(new_content_obj)
     except (ValueError, json.JSONDecodeError) as e:
@@ -463,16 +944,18 @@ async def regenerate_syllaby_content(
         )
 
     update_data = schemas.SyllabusUpdate(generated_content=new_content)
-    updated_syllaby = crud.update_syllaby(db, db_syllaby, update_data)
+    updated_syllaby = await run_in_threadpool(
+        crud.update_syllaby, db, db_syllaby, update_data
+    )
 
-    return await read_syllaby(updated_syllaby.id, current_user, db)
+    return _syllabus_detail(updated_syllaby)
 
 
 @app.put("/syllaby/{syllaby_id}", response_model=schemas.Syllabus)
 async def update_syllaby_endpoint(
     syllaby_id: int,
     syllaby_update: schemas.SyllabusUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_syllaby = crud.get_syllaby(db, syllaby_id=syllaby_id)
@@ -482,7 +965,8 @@ async def update_syllaby_endpoint(
         raise HTTPException(
             status_code=403, detail="Not authorized to update this syllaby"
         )
-    return crud.update_syllaby(
+    return await run_in_threadpool(
+        crud.update_syllaby,
         db=db, db_syllaby=db_syllaby, syllaby_update=syllaby_update
     )
 
@@ -490,7 +974,7 @@ async def update_syllaby_endpoint(
 @app.delete("/syllaby/{syllaby_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_syllaby_endpoint(
     syllaby_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_syllaby = crud.get_syllaby(db, syllaby_id=syllaby_id)
@@ -508,8 +992,8 @@ async def delete_syllaby_endpoint(
 @app.get("/syllaby/{syllaby_id}/kanban", response_model=schemas.KanbanBoard)
 async def get_kanban_board_endpoint(
     syllaby_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
 ):
     db_syllaby = crud.get_syllaby(db, syllaby_id=syllaby_id)
     if db_syllaby is None or db_syllaby.owner_id != current_user.id:
@@ -523,22 +1007,148 @@ async def get_kanban_board_endpoint(
     return board
 
 
+async def _gather_or_cancel(*calls) -> list:
+    """Like asyncio.gather, but cancels the other calls once one fails."""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _map_ollama(
+    request: Request, label: str, render, chunks: List[str], num_predict: int
+) -> List[str]:
+    """Runs render(text=chunk) for every chunk, AI_MAP_CONCURRENCY at a time.
+
+    The first failed call fails the whole map and stops the calls still
+    running, since no caller can use a partial result.
+    """
+    semaphore = asyncio.Semaphore(AI_MAP_CONCURRENCY)
+
+    async def run(index: int, chunk: str) -> str:
+        async with semaphore:
+            prompt = build_prompt(
+                f"{label} {index + 1}/{len(chunks)}",
+                render,
+                num_predict=num_predict,
+                text=chunk,
+            )
+            return await call_ollama_for_request(
+                request, prompt, num_predict=num_predict
+            )
+
+    return await _gather_or_cancel(
+        *(run(index, chunk) for index, chunk in enumerate(chunks))
+    )
+
+
+async def _summarize_text(request: Request, text: str) -> str:
+    """Summarizes text in one call, or map-reduce style if it spans chunks."""
+    render_summary = (
+        lambda text: f"Summarize the following text concisely and clearly. TEXT: {text} SUMMARY:"
+    )
+    chunks = split_into_chunks(text, AI_CHUNK_TOKENS) or [text]
+    # Each round summarizes the chunks in parallel and regroups the summaries,
+    # until they fit into one final prompt.
+    while len(chunks) > 1:
+        summaries = await _map_ollama(
+            request,
+            "summary chunk",
+            lambda text: f"Summarize this part of a longer text concisely, keeping its key facts and terms. TEXT: {text} SUMMARY:",
+            chunks,
+            num_predict=1024,
+        )
+        regrouped = split_into_chunks("\n\n".join(summaries), AI_CHUNK_TOKENS)
+        if len(regrouped) >= len(chunks):
+            # Summaries that don't shrink are left to the final prompt's budget.
+            regrouped = ["\n\n".join(summaries)]
+        chunks = regrouped
+        render_summary = (
+            lambda text: f"Combine these summaries of consecutive parts of one text into a single concise and clear summary. SUMMARIES: {text} SUMMARY:"
+        )
+    prompt = build_prompt("summary", render_summary, num_predict=4096, text=chunks[0])
+    return await call_ollama_for_request(request, prompt)
+
+
+def _merge_chunk_results(label: str, results: list, parse) -> list:
+    """Parses each chunk's output, skipping chunks the model got wrong."""
+    merged = []
+    for result in results:
+        try:
+            merged.extend(parse(result))
+        except (ValueError, TypeError, ValidationError) as e:
+            print(f"WARNING: Skipping unparseable {label} chunk: {e}")
+    return merged
+
+
+def _parse_key_terms(raw_response: str) -> List[str]:
+    terms = _extract_and_parse_json(raw_response, expected_type=list)
+    return [term.strip() for term in terms if isinstance(term, str) and term.strip()]
+
+
+def _parse_flashcards(raw_response: str) -> List[schemas.Flashcard]:
+    cards = _extract_and_parse_json(raw_response, expected_type=list)
+    return [
+        schemas.Flashcard(**card)
+        for card in cards
+        if isinstance(card, dict) and "front" in card and "back" in card
+    ]
+
+
+async def _extract_key_terms(request: Request, text: str) -> List[str]:
+    results = await _map_ollama(
+        request,
+        "key terms",
+        lambda text: f"""Extract key terms from the text. Respond with ONLY a single, valid JSON array of strings. Example: ["Term 1", "Term 2"]. TEXT: {text}""",
+        split_into_chunks(text, AI_CHUNK_TOKENS),
+        num_predict=1024,
+    )
+    unique_terms = {}
+    for term in _merge_chunk_results("key terms", results, _parse_key_terms):
+        unique_terms.setdefault(term.lower(), term)
+    return list(unique_terms.values())
+
+
+async def _extract_flashcards(request: Request, text: str) -> List[schemas.Flashcard]:
+    results = await _map_ollama(
+        request,
+        "flashcards",
+        lambda text: f"""Generate flashcards from the text as a JSON array of objects with "front" and "back" keys. TEXT: {text} FLASHCARDS (JSON array):""",
+        split_into_chunks(text, AI_CHUNK_TOKENS),
+        num_predict=4096,
+    )
+    unique_cards = {}
+    for card in _merge_chunk_results("flashcards", results, _parse_flashcards):
+        unique_cards.setdefault(" ".join(card.front.lower().split()), card)
+    return list(unique_cards.values())
+
+
 @app.post("/ai/summarize", response_model=schemas.SummaryOutput)
 async def summarize_content(
+    request: Request,
     input: schemas.TextProcessInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
 ):
-    prompt = f"""Summarize the following text concisely and clearly. TEXT: {input.content} SUMMARY:"""
-    return {"summary": call_ollama(prompt)}
+    return {"summary": await _summarize_text(request, input.content)}
 
 
 @app.post("/ai/key-terms", response_model=schemas.KeyTermsOutput)
 async def extract_key_terms(
+    request: Request,
     input: schemas.TextProcessInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
 ):
-    prompt = f"""Extract key terms from the following text as a comma-separated list. TEXT: {input.content} KEY TERMS:"""
-    raw_terms = call_ollama(prompt)
+    prompt = build_prompt(
+        "key terms",
+        lambda text: f"""Extract key terms from the following text as a comma-separated list. TEXT: {text} KEY TERMS:""",
+        num_predict=4096,
+        text=input.content,
+    )
+    raw_terms = await call_ollama_for_request(request, prompt)
     return {
         "key_terms": [term.strip() for term in raw_terms.split(",") if term.strip()]
     }
@@ -546,11 +1156,17 @@ async def extract_key_terms(
 
 @app.post("/ai/flashcards", response_model=schemas.FlashcardsOutput)
 async def generate_flashcards(
+    request: Request,
     input: schemas.TextProcessInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
 ):
-    prompt = f"""Generate flashcards from the text as a JSON array of objects with "front" and "back" keys. TEXT: {input.content} FLASHCARDS (JSON array):"""
-    raw_response = call_ollama(prompt)
+    prompt = build_prompt(
+        "flashcards",
+        lambda text: f"""Generate flashcards from the text as a JSON array of objects with "front" and "back" keys. TEXT: {text} FLASHCARDS (JSON array):""",
+        num_predict=4096,
+        text=input.content,
+    )
+    raw_response = await call_ollama_for_request(request, prompt)
     try:
         flashcards_data = _extract_and_parse_json(raw_response, expected_type=list)
         if not isinstance(flashcards_data, list) or not all(
@@ -569,10 +1185,11 @@ async def generate_flashcards(
 @app.post("/notes", response_model=schemas.Note, status_code=status.HTTP_201_CREATED)
 async def create_note_endpoint(
     note: schemas.NoteCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    return crud.create_user_note(
+    return await run_in_threadpool(
+        crud.create_user_note,
         db=db,
         note=note,
         user_id=current_user.id,
@@ -584,19 +1201,29 @@ async def create_note_endpoint(
 
 @app.get("/notes", response_model=list[schemas.Note])
 async def read_notes_list(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    async_db: AsyncSession | None = Depends(database.get_async_db),
+    cursor: Optional[str] = None,
+    limit: int = PageLimit,
 ):
-    return crud.get_notes_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
+    if async_db is not None:
+        page = await crud_async.get_notes_by_user(
+            async_db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    else:
+        page = crud.get_notes_by_user(
+            db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    return _page_items(response, page)
 
 
 @app.get("/notes/{note_id}", response_model=schemas.Note)
 async def read_note(
     note_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
 ):
     db_note = crud.get_note(db, note_id=note_id)
     if db_note is None:
@@ -610,7 +1237,7 @@ async def read_note(
 async def update_note_endpoint(
     note_id: int,
     note_update: schemas.NoteUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_note = crud.get_note(db, note_id=note_id)
@@ -618,13 +1245,15 @@ async def update_note_endpoint(
         raise HTTPException(status_code=404, detail="Note not found")
     if db_note.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return crud.update_note(db=db, db_note=db_note, note_update=note_update)
+    return await run_in_threadpool(
+        crud.update_note, db=db, db_note=db_note, note_update=note_update
+    )
 
 
 @app.delete("/notes/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_note_endpoint(
     note_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_note = crud.get_note(db, note_id=note_id)
@@ -632,65 +1261,126 @@ async def delete_note_endpoint(
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     if db_note.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    if not crud.delete_note(db, note_id):
+    if not await run_in_threadpool(crud.delete_note, db, note_id):
         raise HTTPException(status_code=500, detail="Failed to delete note")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@app.post("/ai/generate-quiz", response_model=schemas.QuizOutput)
-async def generate_quiz_endpoint(
-    quiz_input: schemas.QuizGenerateInput,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
-):
-    combined_content = []
-    if quiz_input.syllaby_ids:
-        syllaby_list = crud.get_syllaby_by_ids(
-            db, quiz_input.syllaby_ids, current_user.id
-        )
-        if len(syllaby_list) != len(quiz_input.syllaby_ids):
+def _syllabus_week_contents(syllaby: models.Syllabus) -> List[Tuple[int, str, str]]:
+    """(week_number, source text, prompt content) for each week of a syllabus."""
+    try:
+        weeks = json.loads(syllaby.generated_content or "")["weeks"]
+        return [
+            (
+                week_number,
+                json.dumps(week),
+                f"Syllabus: {syllaby.title}\nWeek {week_number}:\n{json.dumps(week)}\n",
+            )
+            for week_number, week in enumerate(weeks, start=1)
+        ]
+    except (ValueError, TypeError, KeyError):
+        content = syllaby.generated_content or syllaby.raw_input_outline
+        if not content or not content.strip():
+            return []
+        content = content.strip()
+        return [(0, content, f"Syllabus: {syllaby.title}\nContent:\n{content}\n")]
+
+
+def _source_fingerprint(source_text: str) -> str:
+    # Only the text questions are generated from, so renaming a source or
+    # re-running a note's summary keeps its questions valid.
+    return hashlib.sha256(source_text.encode()).hexdigest()
+
+
+def _question_sources(
+    syllaby_ids: Optional[List[int]],
+    note_ids: Optional[List[int]],
+    user_id: int,
+    db: Session,
+) -> List[schemas.QuestionPoolSource]:
+    """Resolves quiz sources to syllabus weeks and notes, with their content."""
+    sources = []
+    if syllaby_ids:
+        syllaby_list = crud.get_syllaby_by_ids(db, syllaby_ids, user_id)
+        if len(syllaby_list) != len(syllaby_ids):
             raise HTTPException(status_code=404, detail="Syllabus not found.")
         for syllaby in syllaby_list:
-            combined_content.append(
-                f"Syllabus: {syllaby.title}\nContent:\n{syllaby.generated_content}\n"
-            )
-    if quiz_input.note_ids:
-        notes_list = crud.get_notes_by_ids(db, quiz_input.note_ids, current_user.id)
-        if len(notes_list) != len(quiz_input.note_ids):
+            for week_number, source_text, content in _syllabus_week_contents(
+                syllaby
+            ):
+                sources.append(
+                    schemas.QuestionPoolSource(
+                        source_type="syllabus",
+                        source_id=syllaby.id,
+                        week_number=week_number,
+                        fingerprint=_source_fingerprint(source_text),
+                        content=content,
+                    )
+                )
+    if note_ids:
+        notes_list = crud.get_notes_by_ids(db, note_ids, user_id)
+        if len(notes_list) != len(note_ids):
             raise HTTPException(status_code=404, detail="Note not found.")
         for note in notes_list:
-            combined_content.append(
-                f"Note: {note.title}\nContent:\n{note.original_content}\n{note.summary or ''}\n"
+            sources.append(
+                schemas.QuestionPoolSource(
+                    source_type="note",
+                    source_id=note.id,
+                    fingerprint=_source_fingerprint(note.original_content or ""),
+                    content=f"Note: {note.title}\nContent:\n{note.original_content}\n",
+                )
             )
-    if not combined_content:
-        raise HTTPException(status_code=400, detail="No content sources provided.")
+    if not sources:
+        raise HTTPException(
+            status_code=400, detail="No extractable content found in sources."
+        )
+    return sources
+
 
-    full_content_for_ai = "\n---\n".join(combined_content)
-    final_quiz_data = []
+async def _generate_quiz_questions(
+    ask,
+    question_type: str,
+    num_questions: int,
+    difficulty: str,
+    content: List[str],
+    step_allowed=lambda: True,
+) -> List[dict]:
+    """Generates quiz questions; ask(prompt, num_predict) makes each Ollama call.
 
-    if quiz_input.question_type == "multiple_choice":
-        qa_prompt = f"""Generate {quiz_input.num_questions} questions and correct answers from the content. JSON OUTPUT ONLY: array of objects with "question" and "correct_answer". CONTENT: {full_content_for_ai}"""
+    Used both for live quiz requests and for background pool refills.
+    """
+    questions = []
+
+    if question_type == "multiple_choice":
+        qa_prompt = build_prompt(
+            "quiz questions",
+            lambda content: f"""Generate {num_questions} questions and correct answers of {difficulty} difficulty from the content. JSON OUTPUT ONLY: array of objects with "question" and "correct_answer". CONTENT: {content}""",
+            num_predict=4096,
+            content=content,
+        )
         try:
-            raw_qa_response = call_ollama(qa_prompt, num_predict=4096)
+            raw_qa_response = await ask(qa_prompt, 4096)
             qa_pairs = _extract_and_parse_json(raw_qa_response, expected_type=list)
             if not isinstance(qa_pairs, list):
                 raise ValueError("Expected a list.")
-            qa_pairs = qa_pairs[: quiz_input.num_questions]
+            qa_pairs = qa_pairs[:num_questions]
+        except AIDeadlineExceeded:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"AI failed to generate Q/A pairs: {e}"
             )
 
         for qa in qa_pairs:
+            if not step_allowed():
+                break
             try:
                 question_text, correct_answer_text = (
                     qa["question"],
                     qa["correct_answer"],
                 )
                 distractor_prompt = f"""Generate 3 incorrect answers for this question. Question: "{question_text}" Correct Answer: "{correct_answer_text}" JSON OUTPUT ONLY: array of 3 strings."""
-                raw_distractors_response = call_ollama(
-                    distractor_prompt, num_predict=1024
-                )
+                raw_distractors_response = await ask(distractor_prompt, 1024)
                 distractors = _extract_and_parse_json(
                     raw_distractors_response, expected_type=list
                 )
@@ -699,7 +1389,7 @@ async def generate_quiz_endpoint(
                     continue
                 options = [correct_answer_text] + distractors
                 random.shuffle(options)
-                final_quiz_data.append(
+                questions.append(
                     {
                         "question": question_text,
                         "options": options,
@@ -707,64 +1397,297 @@ async def generate_quiz_endpoint(
                         "question_type": "multiple_choice",
                     }
                 )
+            except AIDeadlineExceeded:
+                break
             except Exception as e:
                 print(f"WARNING: Failed to process MC question: {e}. Skipping.")
                 continue
-    elif quiz_input.question_type == "true_false":
-        prompt = f"""Generate {quiz_input.num_questions} factual statements. JSON OUTPUT ONLY: array of objects with "statement" (string) and "is_true" (boolean). CONTENT: {full_content_for_ai}"""
+    elif question_type == "true_false":
+        prompt = build_prompt(
+            "quiz statements",
+            lambda content: f"""Generate {num_questions} factual statements of {difficulty} difficulty. JSON OUTPUT ONLY: array of objects with "statement" (string) and "is_true" (boolean). CONTENT: {content}""",
+            num_predict=4096,
+            content=content,
+        )
         try:
-            raw_statements_response = call_ollama(prompt, num_predict=4096)
+            raw_statements_response = await ask(prompt, 4096)
             statements = _extract_and_parse_json(
                 raw_statements_response, expected_type=list
             )
             if not isinstance(statements, list):
                 raise ValueError("Expected array.")
-            statements = statements[: quiz_input.num_questions]
+            statements = statements[:num_questions]
             for item in statements:
                 if (
                     "statement" in item
                     and "is_true" in item
                     and isinstance(item["is_true"], bool)
                 ):
-                    final_quiz_data.append(
+                    questions.append(
                         {
                             "question": item["statement"],
                             "correct_answer": "True" if item["is_true"] else "False",
                             "question_type": "true_false",
                         }
                     )
+        except AIDeadlineExceeded:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"AI failed to generate T/F statements: {e}"
             )
     else:
-        prompt = f"""Generate a quiz with {quiz_input.num_questions} {quiz_input.question_type} questions. JSON OUTPUT ONLY: array of objects with "question" and "correct_answer". CONTENT: {full_content_for_ai}"""
+        prompt = build_prompt(
+            "quiz",
+            lambda content: f"""Generate a quiz with {num_questions} {question_type} questions of {difficulty} difficulty. JSON OUTPUT ONLY: array of objects with "question" and "correct_answer". CONTENT: {content}""",
+            num_predict=4096,
+            content=content,
+        )
         try:
-            raw_quiz_response = call_ollama(prompt, num_predict=4096)
+            raw_quiz_response = await ask(prompt, 4096)
             quiz_data = _extract_and_parse_json(raw_quiz_response, expected_type=list)
             if not isinstance(quiz_data, list):
                 raise ValueError("Expected array.")
-            quiz_data = quiz_data[: quiz_input.num_questions]
-            for q in quiz_data:
-                q["question_type"] = quiz_input.question_type
-                final_quiz_data.append(q)
+            for q in quiz_data[:num_questions]:
+                if isinstance(q, dict) and "question" in q and "correct_answer" in q:
+                    q["question_type"] = question_type
+                    questions.append(q)
+        except AIDeadlineExceeded:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"AI failed to generate {quiz_input.question_type} quiz: {e}",
+                detail=f"AI failed to generate {question_type} quiz: {e}",
+            )
+
+    return questions
+
+
+async def _generate_freeform_questions(
+    ask, count: int, difficulty: str, content: List[str]
+) -> List[dict]:
+    render_prompt = lambda content: f"""
+    Based on the following content, generate {count} open-ended question(s) of {difficulty} difficulty.
+
+    **CRITICAL**: Your output MUST be a single, valid JSON array of objects with one key: "question".
+    Example: [{{"question": "What is the primary theme of the provided text?"}}]
+
+    Do not include any other text, explanations, or markdown fences.
+
+    --- CONTENT ---
+    {content}
+    --- END CONTENT ---
+
+    JSON OUTPUT:
+    """
+    prompt = build_prompt(
+        "freeform question", render_prompt, num_predict=1024, content=content
+    )
+    raw_output = await ask(prompt, 1024)
+    parsed_json = _extract_and_parse_json(raw_output, expected_type=list)
+    return [
+        {"question": item["question"].strip()}
+        for item in parsed_json
+        if isinstance(item, dict)
+        and isinstance(item.get("question"), str)
+        and item["question"].strip()
+    ][:count]
+
+
+async def _ask_ollama_in_background(prompt: str, num_predict: int) -> str:
+    return await run_in_threadpool(call_ollama, prompt, num_predict=num_predict)
+
+
+def _with_session(crud_function, *args):
+    db = database.SessionLocal()
+    try:
+        return crud_function(db, *args)
+    finally:
+        db.close()
+
+
+def _source_key(source: schemas.QuestionPoolSource) -> tuple:
+    return (source.source_type, source.source_id, source.week_number)
+
+
+def _sample_sources(
+    sources: List[schemas.QuestionPoolSource],
+) -> List[schemas.QuestionPoolSource]:
+    return random.sample(sources, min(len(sources), QUESTION_POOL_SAMPLE_SOURCES))
+
+
+def _sources_to_refill(
+    sources: List[schemas.QuestionPoolSource],
+    drawn_keys: set,
+    sampled: List[schemas.QuestionPoolSource],
+) -> List[schemas.QuestionPoolSource]:
+    """The sampled sources, then the ones questions were drawn from, capped."""
+    drawn = [source for source in sources if _source_key(source) in drawn_keys]
+    random.shuffle(drawn)
+    picked = {}
+    for source in sampled + drawn:
+        picked.setdefault(_source_key(source), source)
+    return list(picked.values())[:QUESTION_POOL_SAMPLE_SOURCES]
+
+
+async def _record_live_questions(
+    user_id: int,
+    sources: List[schemas.QuestionPoolSource],
+    question_type: str,
+    difficulty: str,
+    questions: List[dict],
+) -> None:
+    try:
+        for source in sources:
+            await run_in_threadpool(
+                _with_session,
+                crud.add_pooled_questions,
+                user_id,
+                source,
+                question_type,
+                difficulty,
+                questions,
+                True,
             )
+    except Exception as e:
+        print(f"WARNING: Failed to record live questions in the pool: {e}")
+
+
+async def _refill_pool(
+    user_id: int,
+    source: schemas.QuestionPoolSource,
+    question_type: str,
+    difficulty: str,
+) -> None:
+    unserved = await run_in_threadpool(
+        _with_session,
+        crud.count_unserved_questions,
+        user_id,
+        source,
+        question_type,
+        difficulty,
+    )
+    if unserved >= QUESTION_POOL_LOW_WATER:
+        return
+    if question_type == "freeform":
+        questions = await _generate_freeform_questions(
+            _ask_ollama_in_background,
+            QUESTION_POOL_BATCH_SIZE,
+            difficulty,
+            [source.content],
+        )
+    else:
+        questions = await _generate_quiz_questions(
+            _ask_ollama_in_background,
+            question_type,
+            QUESTION_POOL_BATCH_SIZE,
+            difficulty,
+            [source.content],
+        )
+    await run_in_threadpool(
+        _with_session,
+        crud.add_pooled_questions,
+        user_id,
+        source,
+        question_type,
+        difficulty,
+        questions,
+    )
+
+
+async def _refill_question_pool(
+    user_id: int,
+    sources: List[schemas.QuestionPoolSource],
+    question_type: str,
+    difficulty: str,
+) -> None:
+    """Tops up, one source at a time, each given pool below the low-water mark."""
+    for source in sources:
+        key = (user_id, *_source_key(source), question_type, difficulty)
+        if key in question_pool_refills_in_flight:
+            continue
+        question_pool_refills_in_flight.add(key)
+        try:
+            async with question_pool_refill_slots:
+                await _refill_pool(user_id, source, question_type, difficulty)
+        except Exception as e:
+            print(f"WARNING: Failed to refill question pool {key}: {e}")
+        finally:
+            question_pool_refills_in_flight.discard(key)
+
+
+@app.post("/ai/generate-quiz", response_model=schemas.QuizOutput)
+async def generate_quiz_endpoint(
+    request: Request,
+    quiz_input: schemas.QuizGenerateInput,
+    background_tasks: BackgroundTasks,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_db),
+):
+    sources = _question_sources(
+        quiz_input.syllaby_ids, quiz_input.note_ids, current_user.id, db
+    )
+    final_quiz_data, drawn_keys = await run_in_threadpool(
+        crud.take_pooled_questions,
+        db,
+        current_user.id,
+        sources,
+        quiz_input.question_type,
+        quiz_input.difficulty,
+        quiz_input.num_questions,
+    )
+    for question in final_quiz_data:
+        if question.get("options"):
+            random.shuffle(question["options"])
+
+    # Only what the pool couldn't supply is generated while the user waits.
+    missing = quiz_input.num_questions - len(final_quiz_data)
+    sampled = _sample_sources(sources) if missing else []
+    background_tasks.add_task(
+        _refill_question_pool,
+        current_user.id,
+        _sources_to_refill(sources, drawn_keys, sampled),
+        quiz_input.question_type,
+        quiz_input.difficulty,
+    )
+    if missing:
+        try:
+            live_questions = await _generate_quiz_questions(
+                lambda prompt, num_predict: call_ollama_for_request(
+                    request, prompt, num_predict=num_predict
+                ),
+                quiz_input.question_type,
+                missing,
+                quiz_input.difficulty,
+                [source.content for source in sampled],
+                step_allowed=lambda: ai_budget_allows(request),
+            )
+            await _record_live_questions(
+                current_user.id,
+                sampled,
+                quiz_input.question_type,
+                quiz_input.difficulty,
+                live_questions,
+            )
+            final_quiz_data += live_questions
+        except HTTPException:
+            if not final_quiz_data:
+                raise
+            _request_usage(request).partial = True
 
     if not final_quiz_data:
+        if ai_result_partial(request):
+            raise AIDeadlineExceeded()
         raise HTTPException(
             status_code=500, detail="AI failed to generate any valid questions."
         )
-    return {"quiz": final_quiz_data}
+    return {"quiz": final_quiz_data, "partial": ai_result_partial(request)}
 
 
 @app.post("/ai/submit-quiz", response_model=schemas.QuizResultOutput)
 async def submit_quiz_endpoint(
     submission_input: schemas.QuizSubmissionInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     total_questions = len(submission_input.quiz_questions)
@@ -803,7 +1726,8 @@ async def submit_quiz_endpoint(
             if submission_input.quiz_questions
             else "General Quiz"
         )
-        crud.create_quiz_attempt(
+        await run_in_threadpool(
+            crud.create_quiz_attempt,
             db, user_id=current_user.id, score=score, topic=topic_name
         )
     except Exception as e:
@@ -823,7 +1747,7 @@ def _get_combined_content(
     note_ids: Optional[List[int]],
     user_id: int,
     db: Session,
-) -> str:
+) -> List[str]:
     combined_content_parts = []
     if syllaby_ids:
         syllaby_list = crud.get_syllaby_by_ids(db, syllaby_ids, user_id)
@@ -851,83 +1775,156 @@ def _get_combined_content(
         raise HTTPException(
             status_code=400, detail="No extractable content found in sources."
         )
-    return "\n---\n".join(combined_content_parts)
+    return combined_content_parts
+
+
+class FreeformQuestionCache:
+    """Unanswered freeform questions, kept until answered or ttl_seconds old.
+
+    Entries reference the question's sources and a hash of their content
+    instead of holding the content, so each one is small whatever the size of
+    the sources; the context is rebuilt from the database when scoring.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(question_id)
+            if entry is None:
+                return None
+            expires_at, question = entry
+            if expires_at < time.monotonic():
+                del self._entries[question_id]
+                return None
+            return question
+
+    def set(self, question_id: str, question: dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[question_id] = (now + self.ttl_seconds, question)
+            # Every entry has the same TTL, so the oldest ones expire first.
+            while self._entries:
+                expires_at, _ = next(iter(self._entries.values()))
+                if expires_at >= now and len(self._entries) <= self.max_size:
+                    break
+                self._entries.popitem(last=False)
+
+    def pop(self, question_id: str) -> None:
+        with self._lock:
+            self._entries.pop(question_id, None)
+
+
+freeform_question_cache = FreeformQuestionCache(
+    FREEFORM_QUESTION_CACHE_MAX_SIZE, FREEFORM_QUESTION_TTL_SECONDS
+)
+
+
+def _sources_content_hash(sources: List[schemas.QuestionPoolSource]) -> str:
+    return hashlib.sha256(
+        "".join(source.fingerprint for source in sources).encode()
+    ).hexdigest()
 
 
 @app.post(
     "/ai/generate-freeform-question", response_model=schemas.FreeFormQuestionOutput
 )
 async def generate_freeform_question_endpoint(
+    request: Request,
     question_input: schemas.FreeFormQuestionGenerateInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    combined_content = _get_combined_content(
+    sources = _question_sources(
         question_input.syllaby_ids, question_input.note_ids, current_user.id, db
     )
+    questions, drawn_keys = await run_in_threadpool(
+        crud.take_pooled_questions,
+        db, current_user.id, sources, "freeform", question_input.difficulty, 1
+    )
+    sampled = [] if questions else _sample_sources(sources)
+    background_tasks.add_task(
+        _refill_question_pool,
+        current_user.id,
+        _sources_to_refill(sources, drawn_keys, sampled),
+        "freeform",
+        question_input.difficulty,
+    )
 
-    prompt = f"""
-    Based on the following content, generate ONE SINGLE open-ended question of {question_input.difficulty} difficulty.
-
-    **CRITICAL**: Your output MUST be a single, valid JSON object with one key: "question".
-    Example: {{"question": "What is the primary theme of the provided text?"}}
-
-    Do not include any other text, explanations, or markdown fences.
-
-    --- CONTENT ---
-    {combined_content}
-    --- END CONTENT ---
-
-    JSON OUTPUT:
-    """
-
-    try:
-        raw_output = call_ollama(prompt, num_predict=1024)
-        parsed_json = _extract_and_parse_json(raw_output)
-
-        question_text = parsed_json.get("question")
-        if (
-            not question_text
-            or not isinstance(question_text, str)
-            or not question_text.strip()
-        ):
-            raise ValueError(
-                "AI returned a malformed or empty question in the JSON object."
+    if not questions:
+        try:
+            questions = await _generate_freeform_questions(
+                lambda prompt, num_predict: call_ollama_for_request(
+                    request, prompt, num_predict=num_predict
+                ),
+                1,
+                question_input.difficulty,
+                [source.content for source in sampled],
             )
+            if not questions:
+                raise ValueError(
+                    "AI returned a malformed or empty question in the JSON output."
+                )
+        except (ValueError, KeyError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI failed to generate a valid question structure: {e}",
+            )
+        await _record_live_questions(
+            current_user.id, sampled, "freeform", question_input.difficulty, questions
+        )
 
-        question_id = str(uuid.uuid4())
-
-        freeform_question_cache[question_id] = {
+    question_text = questions[0]["question"]
+    question_id = str(uuid.uuid4())
+    freeform_question_cache.set(
+        question_id,
+        {
             "question": question_text,
-            "source_content_context": combined_content,
-        }
+            "owner_id": current_user.id,
+            "syllaby_ids": question_input.syllaby_ids,
+            "note_ids": question_input.note_ids,
+            "content_hash": _sources_content_hash(sources),
+        },
+    )
+    return schemas.FreeFormQuestionOutput(
+        question_id=question_id, question=question_text
+    )
 
-        return schemas.FreeFormQuestionOutput(
-            question_id=question_id, question=question_text
-        )
-    except (ValueError, KeyError) as e:
+
+def _cached_freeform_question(question_id: str, user_id: int) -> dict:
+    cached_data = freeform_question_cache.get(question_id)
+    if cached_data is None or cached_data["owner_id"] != user_id:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI failed to generate a valid question structure: {e}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found or session expired. Please generate a new question.",
         )
+    return cached_data
 
 
-@app.post("/ai/score-freeform-answer", response_model=schemas.FreeFormAnswerOutput)
-async def score_freeform_answer_endpoint(
-    answer_input: schemas.FreeFormAnswerInput,
-    current_user: models.User = Depends(auth.get_current_user),
-):
-    try:
-        cached_data = freeform_question_cache[answer_input.question_id]
-        question = cached_data["question"]
-        context = cached_data["source_content_context"]
-    except KeyError:
+def _freeform_question_context(
+    cached_data: dict, user_id: int, db: Session
+) -> List[str]:
+    """Rebuilds the content a cached question was generated from."""
+    sources = _question_sources(
+        cached_data["syllaby_ids"], cached_data["note_ids"], user_id, db
+    )
+    if _sources_content_hash(sources) != cached_data["content_hash"]:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Question not found or session expired. Please generate a new question.",
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The question's source material has changed since it was generated. Please generate a new question.",
         )
+    return [source.content for source in sources]
 
-    prompt = f"""
+
+async def _score_freeform_answer(
+    request: Request, question: str, context: List[str], user_answer: str
+) -> schemas.FreeFormAnswerOutput:
+    render_prompt = lambda question, answer, context: f"""
     You are a strict AI evaluator. Your primary task is to compare the USER'S ANSWER directly against the provided CONTEXT and score it.
 
     **CRITICAL RULES:**
@@ -950,20 +1947,27 @@ async def score_freeform_answer_endpoint(
     --- END QUESTION ---
 
     --- USER'S ANSWER ---
-    {answer_input.user_answer}
+    {answer}
     --- END USER'S ANSWER ---
 
     JSON EVALUATION:
     """
-    raw_response = call_ollama(prompt, num_predict=1024)
+    # The question and answer outrank the context, and the context parts most
+    # relevant to the question are kept first.
+    prompt = build_prompt(
+        "freeform scoring",
+        render_prompt,
+        num_predict=1024,
+        query=question,
+        question=question,
+        answer=user_answer,
+        context=context,
+    )
+    raw_response = await call_ollama_for_request(request, prompt, num_predict=1024)
 
     try:
-        del freeform_question_cache[answer_input.question_id]
-
         parsed_data = _extract_and_parse_json(raw_response)
-
         return schemas.FreeFormAnswerOutput(**parsed_data)
-
     except (json.JSONDecodeError, ValueError, ValidationError, KeyError) as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -971,17 +1975,173 @@ async def score_freeform_answer_endpoint(
         )
 
 
+@app.post("/ai/score-freeform-answer", response_model=schemas.FreeFormAnswerOutput)
+async def score_freeform_answer_endpoint(
+    request: Request,
+    answer_input: schemas.FreeFormAnswerInput,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_db),
+):
+    cached_data = _cached_freeform_question(answer_input.question_id, current_user.id)
+    context = _freeform_question_context(cached_data, current_user.id, db)
+    evaluation = await _score_freeform_answer(
+        request, cached_data["question"], context, answer_input.user_answer
+    )
+    freeform_question_cache.pop(answer_input.question_id)
+    return evaluation
+
+
+async def _score_freeform_batch(
+    request: Request, context: List[str], items: List[Tuple[str, str]]
+) -> List[Optional[schemas.FreeFormAnswerOutput]]:
+    """Scores (question, answer) pairs that share a context in one call.
+
+    Entries the model left out or got wrong come back as None.
+    """
+    render_prompt = lambda answers, context: f"""
+    You are a strict AI evaluator. Your primary task is to compare each numbered USER'S ANSWER directly against the provided CONTEXT and its QUESTION, and score it.
+
+    **CRITICAL RULES:**
+    1.  You MUST evaluate ONLY the text given as each "USER'S ANSWER". Do NOT invent a good answer and evaluate that.
+    2.  If a USER'S ANSWER is nonsensical, gibberish, completely irrelevant to its question, or says "I don't know", you MUST give it a `score_percentage` of 0.
+    3.  Each feedback must directly address that USER'S ANSWER, explaining why it is correct or incorrect.
+
+    **JSON OUTPUT FORMAT (MANDATORY):**
+    Your output MUST be a single, valid JSON array with one object per numbered answer. Each object has four keys:
+    1. "index" (integer): The number of the answer being scored.
+    2. "is_correct" (boolean): Is the answer fundamentally correct?
+    3. "score_percentage" (integer): A score from 0 to 100.
+    4. "feedback" (string): Constructive feedback explaining the score.
+
+    --- CONTEXT TO EVALUATE AGAINST ---
+    {context}
+    --- END CONTEXT ---
+
+    --- ANSWERS TO SCORE ---
+    {answers}
+    --- END ANSWERS ---
+
+    JSON EVALUATION (array):
+    """
+    num_predict = 256 * len(items) + 256
+    prompt = build_prompt(
+        "freeform batch scoring",
+        render_prompt,
+        num_predict=num_predict,
+        query=" ".join(question for question, _ in items),
+        answers=[
+            f"ANSWER {index}\nQUESTION: {question}\nUSER'S ANSWER: {answer}"
+            for index, (question, answer) in enumerate(items, start=1)
+        ],
+        context=context,
+    )
+    raw_response = await call_ollama_for_request(
+        request, prompt, num_predict=num_predict
+    )
+
+    evaluations: List[Optional[schemas.FreeFormAnswerOutput]] = [None] * len(items)
+    try:
+        parsed_data = _extract_and_parse_json(raw_response, expected_type=list)
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"WARNING: Batch freeform scoring returned no JSON array: {e}")
+        return evaluations
+    for position, entry in enumerate(parsed_data):
+        try:
+            # Fall back to the position when the model leaves out the index.
+            index = int(entry.get("index", position + 1)) - 1
+            if 0 <= index < len(items) and evaluations[index] is None:
+                evaluations[index] = schemas.FreeFormAnswerOutput(**entry)
+        except (AttributeError, TypeError, ValueError, ValidationError) as e:
+            print(f"WARNING: Skipping invalid batch freeform evaluation: {e}")
+    return evaluations
+
+
+@app.post(
+    "/ai/score-freeform-answers", response_model=schemas.FreeFormBatchAnswerOutput
+)
+async def score_freeform_answers_endpoint(
+    request: Request,
+    batch_input: schemas.FreeFormBatchAnswerInput,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_db),
+):
+    """Scores several answers with one call per shared context.
+
+    Answers whose batch evaluation is missing or invalid are rescored one by
+    one, AI_MAP_CONCURRENCY at a time.
+    """
+    cached = [
+        _cached_freeform_question(answer.question_id, current_user.id)
+        for answer in batch_input.answers
+    ]
+    groups: Dict[str, List[int]] = {}
+    for position, cached_data in enumerate(cached):
+        groups.setdefault(cached_data["content_hash"], []).append(position)
+    # Questions with the same content hash share one rebuilt context.
+    contexts = {
+        content_hash: _freeform_question_context(
+            cached[positions[0]], current_user.id, db
+        )
+        for content_hash, positions in groups.items()
+    }
+
+    evaluations: List[Optional[schemas.FreeFormAnswerOutput]] = [None] * len(cached)
+    for content_hash, positions in groups.items():
+        if len(positions) == 1:
+            continue
+        batch_evaluations = await _score_freeform_batch(
+            request,
+            contexts[content_hash],
+            [
+                (cached[p]["question"], batch_input.answers[p].user_answer)
+                for p in positions
+            ],
+        )
+        for position, evaluation in zip(positions, batch_evaluations):
+            evaluations[position] = evaluation
+
+    semaphore = asyncio.Semaphore(AI_MAP_CONCURRENCY)
+
+    async def score_one(position: int) -> None:
+        async with semaphore:
+            evaluations[position] = await _score_freeform_answer(
+                request,
+                cached[position]["question"],
+                contexts[cached[position]["content_hash"]],
+                batch_input.answers[position].user_answer,
+            )
+
+    fallback = [p for p, evaluation in enumerate(evaluations) if evaluation is None]
+    if fallback:
+        print(f"Freeform batch scoring: rescoring {len(fallback)} answer(s) one by one")
+        await _gather_or_cancel(*(score_one(position) for position in fallback))
+
+    for answer in batch_input.answers:
+        freeform_question_cache.pop(answer.question_id)
+    return schemas.FreeFormBatchAnswerOutput(
+        results=[
+            schemas.FreeFormBatchAnswerResult(
+                question_id=answer.question_id, **evaluation.model_dump()
+            )
+            for answer, evaluation in zip(batch_input.answers, evaluations)
+        ]
+    )
+
+
 @app.post("/ai/chat/start", response_model=schemas.ChatSessionOutput)
 async def start_chat_session(
+    request: Request,
     session_input: schemas.ChatSessionStartInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     session_id = str(uuid.uuid4())
     combined_content = ""
     if session_input.syllaby_ids or session_input.note_ids:
-        combined_content = _get_combined_content(
-            session_input.syllaby_ids, session_input.note_ids, current_user.id, db
+        combined_content = "\n---\n".join(
+            _get_combined_content(
+                session_input.syllaby_ids, session_input.note_ids, current_user.id, db
+            )
         )
 
     system_prompt = (
@@ -1001,7 +2161,11 @@ async def start_chat_session(
         schemas.ChatMessage(role="user", content=greeting_elicit_prompt),
     ]
 
-    initial_ai_message_content = call_ollama(messages=initial_messages, num_predict=256)
+    initial_ai_message_content = await call_ollama_for_request(
+        request,
+        messages=fit_messages("chat start", initial_messages, num_predict=256),
+        num_predict=256,
+    )
 
     final_initial_history = [
         schemas.ChatMessage(role="system", content=system_prompt),
@@ -1020,9 +2184,10 @@ async def start_chat_session(
 
 @app.post("/ai/chat/{session_id}/message", response_model=schemas.ChatResponseOutput)
 async def send_chat_message(
+    request: Request,
     chat_message_input: schemas.ChatRequestInput,
     session_id: str = Path(..., description="The ID of the chat session."),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
 ):
     if session_id not in chat_sessions:
         raise HTTPException(
@@ -1040,7 +2205,11 @@ async def send_chat_message(
     )
 
     try:
-        ai_response = call_ollama(messages=messages_history, num_predict=1024)
+        ai_response = await call_ollama_for_request(
+            request,
+            messages=fit_messages("chat", messages_history, num_predict=1024),
+            num_predict=1024,
+        )
         messages_history.append(
             schemas.ChatMessage(role="assistant", content=ai_response)
         )
@@ -1055,7 +2224,7 @@ async def send_chat_message(
 )
 async def create_kanban_board_endpoint(
     board: schemas.KanbanBoardCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     return crud.create_user_kanban_board(db=db, board=board, user_id=current_user.id)
@@ -1063,24 +2232,126 @@ async def create_kanban_board_endpoint(
 
 @app.get("/kanban", response_model=List[schemas.KanbanBoard])
 async def get_kanban_boards_endpoint(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    async_db: AsyncSession | None = Depends(database.get_async_db),
 ):
+    if async_db is not None:
+        return await crud_async.get_kanban_boards_by_user(
+            async_db, user_id=current_user.id
+        )
     return crud.get_kanban_boards_by_user(db=db, user_id=current_user.id)
 
 
+MAX_TASK_RANGE_DAYS = 400
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Due dates are stored naive; bounds given with a zone are moved to UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@app.get("/kanban/tasks", response_model=schemas.KanbanTaskRange)
+async def get_tasks_in_range(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    include_completed: bool = True,
+    include_tasks: bool = True,
+    per_day: bool = False,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+):
+    start, end = _naive_utc(start), _naive_utc(end)
+    if end <= start or end - start > timedelta(days=MAX_TASK_RANGE_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'to' must be after 'from' and at most {MAX_TASK_RANGE_DAYS} days later",
+        )
+    tasks = (
+        crud.get_tasks_due_between(db, current_user.id, start, end, include_completed)
+        if include_tasks
+        else []
+    )
+    day_counts = (
+        crud.get_task_counts_by_day(db, current_user.id, start, end, include_completed)
+        if per_day
+        else None
+    )
+    return schemas.KanbanTaskRange(tasks=tasks, day_counts=day_counts)
+
+
 @app.get("/kanban/{board_id}", response_model=schemas.KanbanBoard)
 async def get_kanban_board_details_endpoint(
     board_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    request: Request,
+    response: Response,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    async_db: AsyncSession | None = Depends(database.get_async_db),
 ):
-    board = crud.get_kanban_board(db, board_id=board_id, user_id=current_user.id)
+    version = crud.get_kanban_board_version(
+        db, board_id=board_id, user_id=current_user.id
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Kanban board not found")
+    etag = _etag("kanban_board", board_id, *version)
+    not_modified = _conditional_get(request, response, etag, BOARD_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    if async_db is not None:
+        board = await crud_async.get_kanban_board(
+            async_db, board_id=board_id, user_id=current_user.id
+        )
+    else:
+        board = crud.get_kanban_board(db, board_id=board_id, user_id=current_user.id)
     if not board:
         raise HTTPException(status_code=404, detail="Kanban board not found")
     return board
 
 
+@app.get("/kanban/{board_id}/events")
+async def stream_kanban_board_events(
+    board_id: int,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_db),
+):
+    """Server-sent events with task diffs for the board.
+
+    Each message is {"board_id", "events": [...]}, with events of type create,
+    update, move (task plus destination index), delete (task_id), resync and
+    board_deleted. Clients should refetch the board on (re)connect and resync.
+    """
+    version = crud.get_kanban_board_version(
+        db, board_id=board_id, user_id=current_user.id
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Kanban board not found")
+    # Release the pooled connection; the stream can stay open for hours.
+    db.rollback()
+
+    async def event_stream():
+        with board_event_hub.subscribe(board_id) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), BOARD_EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post(
     "/kanban/columns/{column_id}/tasks",
     response_model=schemas.KanbanTask,
@@ -1089,10 +2360,11 @@ async def get_kanban_board_details_endpoint(
 async def create_kanban_task_endpoint(
     column_id: int,
     task: schemas.KanbanTaskCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    db_task = crud.create_kanban_task(
+    db_task = await run_in_threadpool(
+        crud.create_kanban_task,
         db, task=task, column_id=column_id, user_id=current_user.id
     )
     if not db_task:
@@ -1106,10 +2378,11 @@ async def create_kanban_task_endpoint(
 async def move_task_on_board(
     board_id: int,
     move_data: schemas.KanbanTaskMove,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    updated_task = crud.move_kanban_task(
+    updated_task = await run_in_threadpool(
+        crud.move_kanban_task,
         db=db, move_data=move_data, user_id=current_user.id
     )
     if not updated_task:
@@ -1119,19 +2392,56 @@ async def move_task_on_board(
     return updated_task
 
 
+@app.post("/kanban/{board_id}/batch", response_model=schemas.KanbanBatchOutput)
+async def apply_kanban_batch_endpoint(
+    board_id: int,
+    batch: schemas.KanbanBatchInput,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_db),
+):
+    result = await run_in_threadpool(
+        crud.apply_kanban_batch,
+        db, board_id=board_id, user_id=current_user.id, operations=batch.operations
+    )
+    if result is None:
+        raise HTTPException(
+            status_code=404, detail="Task or column not found, or permission denied."
+        )
+    affected_tasks, deleted_ids, completed_any = result
+    if completed_any:
+        await run_in_threadpool(
+            crud.update_user_streak, db, user=crud.get_user(db, current_user.id)
+        )
+    return schemas.KanbanBatchOutput(
+        tasks=affected_tasks, deleted_task_ids=deleted_ids
+    )
+
+
 @app.get("/kanban/tasks/all", response_model=List[schemas.KanbanTask])
 async def get_all_user_tasks_endpoint(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    response: Response,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    async_db: AsyncSession | None = Depends(database.get_async_db),
+    cursor: Optional[str] = None,
+    limit: int = PageLimit,
 ):
-    return crud.get_all_tasks_by_user(db=db, user_id=current_user.id)
+    if async_db is not None:
+        page = await crud_async.get_all_tasks_by_user(
+            async_db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    else:
+        page = crud.get_all_tasks_by_user(
+            db=db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    return _page_items(response, page)
 
 
 @app.get("/kanban/tasks/{task_id}", response_model=schemas.KanbanTask)
 async def get_task_details_endpoint(
     task_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
 ):
     task = crud.get_task_by_id(db, task_id=task_id, user_id=current_user.id)
     if not task:
@@ -1143,7 +2453,7 @@ async def get_task_details_endpoint(
 async def update_task_details_endpoint(
     task_id: int,
     task_update: schemas.KanbanTaskUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_task = crud.get_task_by_id(db, task_id=task_id, user_id=current_user.id)
@@ -1153,21 +2463,26 @@ async def update_task_details_endpoint(
         )
 
     is_being_completed = task_update.completed is True and not db_task.completed
-    updated_task = crud.update_kanban_task(
-        db=db, db_task=db_task, task_update=task_update
+    updated_task = await run_in_threadpool(
+        crud.update_kanban_task,
+        db=db, db_task=db_task, task_update=task_update, user_id=current_user.id
     )
     if is_being_completed:
-        crud.update_user_streak(db, user=current_user)
+        await run_in_threadpool(
+            crud.update_user_streak, db, user=crud.get_user(db, current_user.id)
+        )
     return updated_task
 
 
 @app.delete("/kanban/tasks/{task_id}", status_code=204)
 async def delete_task_endpoint(
     task_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    if not crud.delete_kanban_task(db, task_id=task_id, user_id=current_user.id):
+    if not await run_in_threadpool(
+        crud.delete_kanban_task, db, task_id=task_id, user_id=current_user.id
+    ):
         raise HTTPException(
             status_code=404, detail="Task not found or permission denied"
         )
@@ -1176,40 +2491,30 @@ async def delete_task_endpoint(
 
 @app.post("/ai/process-content", response_model=schemas.ProcessedNoteContent)
 async def process_content_for_note(
+    request: Request,
     input: schemas.TextProcessInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
 ):
     summary = ""
     key_terms = []
     flashcards = []
 
     try:
-        summary_prompt = f"Summarize the following text concisely and clearly. TEXT: {input.content} SUMMARY:"
-        summary = call_ollama(summary_prompt)
+        summary = await _summarize_text(request, input.content)
     except Exception as e:
         print(f"Warning: Failed to generate summary. Error: {e}")
 
     try:
-        terms_prompt = f"""Extract key terms from the text. Respond with ONLY a single, valid JSON array of strings. Example: ["Term 1", "Term 2"]. TEXT: {input.content}"""
-        raw_terms_response = call_ollama(terms_prompt, num_predict=1024)
-        key_terms = _extract_and_parse_json(raw_terms_response, expected_type=list)
-        if not isinstance(key_terms, list):
-            key_terms = []
+        if not ai_budget_allows(request):
+            raise AIDeadlineExceeded()
+        key_terms = await _extract_key_terms(request, input.content)
     except Exception as e:
         print(f"Warning: Failed to generate key terms. Error: {e}")
 
     try:
-        flashcards_prompt = f"""Generate flashcards from the text as a JSON array of objects with "front" and "back" keys. TEXT: {input.content} FLASHCARDS (JSON array):"""
-        raw_flashcards_response = call_ollama(flashcards_prompt)
-        flashcards_data = _extract_and_parse_json(
-            raw_flashcards_response, expected_type=list
-        )
-        if isinstance(flashcards_data, list):
-            flashcards = [
-                schemas.Flashcard(**fc)
-                for fc in flashcards_data
-                if "front" in fc and "back" in fc
-            ]
+        if not ai_budget_allows(request):
+            raise AIDeadlineExceeded()
+        flashcards = await _extract_flashcards(request, input.content)
     except Exception as e:
         print(f"Warning: Failed to generate flashcards. Error: {e}")
 
@@ -1218,14 +2523,16 @@ async def process_content_for_note(
         summary=summary,
         key_terms=key_terms,
         flashcards=flashcards,
+        partial=ai_result_partial(request),
     )
 
 
 @app.post("/ai/process-note/{note_id}", response_model=schemas.Note)
 async def reprocess_note_content(
+    request: Request,
     note_id: int,
     reprocess_input: schemas.NoteReprocessInput,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_note = crud.get_note(db, note_id=note_id)
@@ -1236,36 +2543,25 @@ async def reprocess_note_content(
 
     content = db_note.original_content
     update_data = schemas.NoteUpdate()
+    # Release the pooled connection while the model runs.
+    db.rollback()
 
     if reprocess_input.action in ["summary", "all"]:
-        prompt = f"Summarize concisely: {content}"
-        update_data.summary = call_ollama(prompt)
+        update_data.summary = await _summarize_text(request, content)
     if reprocess_input.action in ["key-terms", "all"]:
-        prompt = f"""Extract key terms from the text. Respond with ONLY a single, valid JSON array of strings. Example: ["Term 1", "Term 2"]. TEXT: {content}"""
-        raw_terms = call_ollama(prompt, num_predict=1024)
-        try:
-            update_data.key_terms = _extract_and_parse_json(
-                raw_terms, expected_type=list
-            )
-        except (ValueError, json.JSONDecodeError):
-            update_data.key_terms = []
+        update_data.key_terms = await _extract_key_terms(request, content)
     if reprocess_input.action in ["flashcards", "all"]:
-        prompt = f"""Generate flashcards as a JSON array of objects with "front" and "back" keys: {content}"""
-        raw_flashcards = call_ollama(prompt)
-        try:
-            flashcards = _extract_and_parse_json(raw_flashcards, expected_type=list)
-            update_data.flashcards = [schemas.Flashcard(**fc) for fc in flashcards]
-        except (json.JSONDecodeError, ValueError, ValidationError) as e:
-            print(f"Warning: Could not parse flashcards from AI: {e}")
-            update_data.flashcards = []
+        update_data.flashcards = await _extract_flashcards(request, content)
 
-    return crud.update_note(db=db, db_note=db_note, note_update=update_data)
+    return await run_in_threadpool(
+        crud.update_note, db=db, db_note=db_note, note_update=update_data
+    )
 
 
 @app.delete("/kanban/{board_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_kanban_board_endpoint(
     board_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     if not crud.delete_kanban_board(db=db, board_id=board_id, user_id=current_user.id):
@@ -1282,7 +2578,7 @@ async def delete_kanban_board_endpoint(
 )
 async def create_kanban_from_existing_syllabus(
     syllabus_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_syllabus = crud.get_syllaby(db, syllaby_id=syllabus_id)
@@ -1322,31 +2618,140 @@ async def create_kanban_from_existing_syllabus(
         )
 
 
+def _build_insight_prompt(
+    upcoming_tasks: List[models.KanbanTask], recent_quizzes: List[models.QuizAttempt]
+) -> str:
+    tasks_summary = [
+        f"- '{t.title}' due on {t.due_date.strftime('%Y-%m-%d')}"
+        for t in upcoming_tasks
+        if t.due_date
+    ]
+    quizzes_summary = [
+        f"- Scored {q.score}% on '{q.quiz_topic}'" for q in recent_quizzes
+    ]
+    return f"""Analyze student progress and provide one actionable insight. JSON OUTPUT ONLY with "insight_text" (string) and "severity" ("low", "medium", "high"). DATA: Upcoming Tasks: {chr(10).join(tasks_summary) or "None"}, Recent Quizzes: {chr(10).join(quizzes_summary) or "None"}"""
+
+
+def _insight_fingerprint(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _is_insight_fresh(db_insight: Optional[models.UserInsight], fingerprint: str) -> bool:
+    if db_insight is None or db_insight.fingerprint != fingerprint:
+        return False
+    age = datetime.utcnow() - db_insight.generated_at
+    return age < timedelta(minutes=INSIGHT_TTL_MINUTES)
+
+
+def _generate_insight(prompt: str) -> schemas.AIPoweredInsight:
+    raw_response = call_ollama(prompt, num_predict=512)
+    parsed_data = _extract_and_parse_json(raw_response)
+    return schemas.AIPoweredInsight(**parsed_data)
+
+
+def _refresh_user_insight(user_id: int, prompt: str, fingerprint: str) -> None:
+    db = database.SessionLocal()
+    try:
+        insight = _generate_insight(prompt)
+        crud.save_user_insight(db, user_id, fingerprint, insight)
+    except Exception as e:
+        print(f"Warning: Failed to refresh AI insight for user {user_id}. Error: {e}")
+    finally:
+        db.close()
+        insight_refreshes_in_flight.discard((user_id, fingerprint))
+
+
+def _schedule_insight_refresh(
+    background_tasks: BackgroundTasks, user_id: int, prompt: str, fingerprint: str
+) -> None:
+    key = (user_id, fingerprint)
+    if key in insight_refreshes_in_flight:
+        return
+    insight_refreshes_in_flight.add(key)
+    background_tasks.add_task(_refresh_user_insight, user_id, prompt, fingerprint)
+
+
+def _build_dashboard_lists(
+    db: Session, user_id: int, progress: models.UserProgress
+) -> dict:
+    upcoming_tasks = (
+        crud.get_upcoming_tasks(db, user_id=user_id, days_ahead=7)
+        if progress.total_tasks > progress.completed_tasks
+        else []
+    )
+    recent_quizzes = (
+        crud.get_recent_quiz_attempts(db, user_id=user_id, limit=5)
+        if progress.quiz_attempts
+        else []
+    )
+    active_challenges = (
+        crud.get_active_challenges_by_user(db, user_id=user_id)
+        if progress.active_challenges
+        else []
+    )
+    return {
+        "upcoming_tasks": [
+            schemas.KanbanTask.model_validate(task).model_dump(mode="json")
+            for task in upcoming_tasks
+        ],
+        "recent_quiz_scores": [
+            schemas.QuizAttempt.model_validate(quiz).model_dump(mode="json")
+            for quiz in recent_quizzes
+        ],
+        "active_challenges": [
+            schemas.Challenge.model_validate(challenge).model_dump(mode="json")
+            for challenge in active_challenges
+        ],
+        "insight_prompt": (
+            _build_insight_prompt(upcoming_tasks, recent_quizzes)
+            if upcoming_tasks or recent_quizzes
+            else None
+        ),
+    }
+
+
 @app.get("/progress/dashboard", response_model=schemas.ProgressDashboardData)
 async def get_progress_dashboard(
-    current_user: models.User = Depends(auth.get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
+    read_db: Session = Depends(database.get_read_db),
 ):
-    task_counts = crud.get_task_counts_by_user(db, user_id=current_user.id)
-    total_tasks = task_counts["total"]
-    completed_tasks = task_counts["completed"]
+    progress, db_insight = crud.get_dashboard_state(db, user_id=current_user.id)
+    if progress is None:
+        progress = crud.get_user_progress(db, user_id=current_user.id)
+        db_insight = crud.get_user_insight(db, user_id=current_user.id)
+    total_tasks = progress.total_tasks
+    completed_tasks = progress.completed_tasks
+
+    # The lists are rebuilt after any write that bumps the progress version,
+    # and daily because the upcoming-task window moves with the date.
+    lists_key = f"{progress.version}:{datetime.now().date()}"
+    if progress.dashboard_lists_key == lists_key:
+        lists = json.loads(progress.dashboard_lists)
+    else:
+        lists = _build_dashboard_lists(read_db, current_user.id, progress)
+        await run_in_threadpool(
+            crud.save_dashboard_lists,
+            db,
+            current_user.id,
+            lists_key,
+            json.dumps(lists),
+        )
 
-    upcoming_tasks = crud.get_upcoming_tasks(db, user_id=current_user.id, days_ahead=7)
-    recent_quizzes = crud.get_recent_quiz_attempts(db, user_id=current_user.id, limit=5)
-    
-    ai_insight = None
-    if upcoming_tasks or recent_quizzes:
-        tasks_summary = [f"- '{t.title}' due on {t.due_date.strftime('%Y-%m-%d')}" for t in upcoming_tasks if t.due_date]
-        quizzes_summary = [f"- Scored {q.score}% on '{q.quiz_topic}'" for q in recent_quizzes]
-        prompt = f"""Analyze student progress and provide one actionable insight. JSON OUTPUT ONLY with "insight_text" (string) and "severity" ("low", "medium", "high"). DATA: Upcoming Tasks: {chr(10).join(tasks_summary) or "None"}, Recent Quizzes: {chr(10).join(quizzes_summary) or "None"}"""
-        
-        try:
-            raw_response = call_ollama(prompt, num_predict=512)
-            parsed_data = _extract_and_parse_json(raw_response)
-            ai_insight = schemas.AIPoweredInsight(**parsed_data)
-        except Exception as e:
-            print(f"Warning: Failed to generate AI insight for dashboard. Error: {e}")
-            ai_insight = schemas.AIPoweredInsight(insight_text="Could not generate AI insight at this time.", severity="low")
+    prompt = lists["insight_prompt"]
+    if prompt:
+        fingerprint = _insight_fingerprint(prompt)
+        if not _is_insight_fresh(db_insight, fingerprint):
+            _schedule_insight_refresh(
+                background_tasks, current_user.id, prompt, fingerprint
+            )
+        if db_insight:
+            ai_insight = schemas.AIPoweredInsight(
+                insight_text=db_insight.insight_text, severity=db_insight.severity
+            )
+        else:
+            ai_insight = schemas.AIPoweredInsight(insight_text="Your personalized insight is being prepared. Check back in a moment.", severity="low")
     else:
         ai_insight = schemas.AIPoweredInsight(insight_text="Not enough data yet for insights. Complete some tasks or quizzes!", severity="low")
 
@@ -1355,16 +2760,37 @@ async def get_progress_dashboard(
         total_tasks=total_tasks,
         completed_tasks=completed_tasks,
         completion_percentage=round((completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0, 2),
-        upcoming_tasks=upcoming_tasks,
-        active_challenges=crud.get_active_challenges_by_user(db, user_id=current_user.id),
-        recent_quiz_scores=recent_quizzes,
+        upcoming_tasks=lists["upcoming_tasks"],
+        active_challenges=lists["active_challenges"],
+        recent_quiz_scores=lists["recent_quiz_scores"],
+        total_quiz_attempts=progress.quiz_attempts,
+        average_quiz_score=round(
+            progress.quiz_score_total / progress.quiz_attempts
+            if progress.quiz_attempts > 0
+            else 0,
+            2,
+        ),
         ai_insight=ai_insight,
     )
 
 
+@app.get("/progress/quiz-attempts", response_model=List[schemas.QuizAttempt])
+async def get_quiz_attempts(
+    response: Response,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    cursor: Optional[str] = None,
+    limit: int = PageLimit,
+):
+    page = crud.get_quiz_attempts_by_user(
+        db, user_id=current_user.id, cursor=cursor, limit=limit
+    )
+    return _page_items(response, page)
+
+
 @app.get("/progress/ai-insights", response_model=schemas.AIPoweredInsight)
 async def get_ai_powered_insights(
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     upcoming_tasks = crud.get_upcoming_tasks(db, user_id=current_user.id, days_ahead=7)
@@ -1375,21 +2801,20 @@ async def get_ai_powered_insights(
             insight_text="Not enough data yet for insights.", severity="low"
         )
 
-    tasks_summary = [
-        f"- '{t.title}' due on {t.due_date.strftime('%Y-%m-%d')}"
-        for t in upcoming_tasks
-        if t.due_date
-    ]
-    quizzes_summary = [
-        f"- Scored {q.score}% on '{q.quiz_topic}'" for q in recent_quizzes
-    ]
-
-    prompt = f"""Analyze student progress and provide one actionable insight. JSON OUTPUT ONLY with "insight_text" (string) and "severity" ("low", "medium", "high"). DATA: Upcoming Tasks: {chr(10).join(tasks_summary) or "None"}, Recent Quizzes: {chr(10).join(quizzes_summary) or "None"}"""
+    prompt = _build_insight_prompt(upcoming_tasks, recent_quizzes)
+    fingerprint = _insight_fingerprint(prompt)
+    db_insight = crud.get_user_insight(db, user_id=current_user.id)
+    if _is_insight_fresh(db_insight, fingerprint):
+        return schemas.AIPoweredInsight(
+            insight_text=db_insight.insight_text, severity=db_insight.severity
+        )
 
     try:
-        raw_response = call_ollama(prompt, num_predict=512)
-        parsed_data = _extract_and_parse_json(raw_response)
-        return schemas.AIPoweredInsight(**parsed_data)
+        insight = _generate_insight(prompt)
+        await run_in_threadpool(
+            crud.save_user_insight, db, current_user.id, fingerprint, insight
+        )
+        return insight
     except (json.JSONDecodeError, ValueError, KeyError, ValidationError) as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to get insight from AI. Error: {e}"
@@ -1399,10 +2824,11 @@ async def get_ai_powered_insights(
 @app.post("/challenges", response_model=schemas.Challenge, status_code=201)
 async def create_new_challenge(
     challenge_data: schemas.ChallengeCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    challenge = crud.create_challenge(
+    challenge = await run_in_threadpool(
+        crud.create_challenge,
         db, user_id=current_user.id, challenge_data=challenge_data
     )
     if not challenge:
@@ -1415,16 +2841,22 @@ async def create_new_challenge(
 
 @app.get("/challenges", response_model=List[schemas.Challenge])
 async def get_user_challenges(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    response: Response,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
+    cursor: Optional[str] = None,
+    limit: int = PageLimit,
 ):
-    return crud.get_active_challenges_by_user(db, user_id=current_user.id)
+    page = crud.get_active_challenges_page(
+        db, user_id=current_user.id, cursor=cursor, limit=limit
+    )
+    return _page_items(response, page)
 
 @app.get("/challenges/{challenge_id}", response_model=schemas.ChallengeDetail)
 async def get_challenge_details(
     challenge_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_read_db),
 ):
     challenge = crud.get_challenge_by_id(db, challenge_id=challenge_id, user_id=current_user.id)
     if not challenge:
@@ -1435,21 +2867,59 @@ async def get_challenge_details(
 async def update_challenge_endpoint(
     challenge_id: int,
     challenge_update: schemas.ChallengeUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
     db_challenge = crud.get_challenge_by_id(db, challenge_id=challenge_id, user_id=current_user.id)
     if not db_challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
-    return crud.update_challenge(db, db_challenge, challenge_update)
+    return await run_in_threadpool(
+        crud.update_challenge, db, db_challenge, challenge_update
+    )
 
 @app.delete("/challenges/{challenge_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_challenge_endpoint(
     challenge_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
     db: Session = Depends(database.get_db),
 ):
-    if not crud.delete_challenge(db, challenge_id=challenge_id, user_id=current_user.id):
+    if not await run_in_threadpool(
+        crud.delete_challenge, db, challenge_id=challenge_id, user_id=current_user.id
+    ):
         raise HTTPException(status_code=404, detail="Challenge not found")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+
+@app.get("/sync", response_model=schemas.SyncChanges)
+async def sync_changes(
+    since: Optional[str] = None,
+    current_user: schemas.AuthenticatedUser = Depends(auth.get_current_identity),
+    db: Session = Depends(database.get_db),
+):
+    """Returns what changed since the sync_token of a previous call.
+
+    Without ``since`` everything is returned (``full`` is true). Clients apply
+    ``deleted`` before the upserted rows. The window is widened by
+    SYNC_OVERLAP_SECONDS so writes committed just after the previous token
+    are not missed, which means a few rows may be repeated. A token older
+    than the tombstone retention gets a full resync instead.
+    """
+    changed_since = None
+    if since:
+        try:
+            changed_since = datetime.fromisoformat(since) - timedelta(
+                seconds=SYNC_OVERLAP_SECONDS
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token"
+            )
+    # Taken from the database clock before reading so nothing written during
+    # this request can fall between this token and the next one.
+    sync_token = crud.get_database_now(db).isoformat()
+    if changed_since and changed_since < crud.sync_retention_cutoff(db):
+        changed_since = None
+    changes = crud.get_sync_changes(db, user_id=current_user.id, since=changed_since)
+    return schemas.SyncChanges(
+        sync_token=sync_token, full=changed_since is None, **changes
+    )
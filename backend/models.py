@@ -6,13 +6,37 @@ from sqlalchemy import (
     Text,
     DateTime,
     ForeignKey,
+    Index,
     Table,
     Date,
 )
-from sqlalchemy.orm import relationship, column_property
-from sqlalchemy.sql import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from sqlalchemy.sql.functions import FunctionElement
 from database import Base
 
+
+class change_time(FunctionElement):
+    """The clock time when the statement runs, for the stamps /sync reads.
+
+    PostgreSQL's now() is the start of the transaction, which can be long
+    before the commit and so before a sync token handed out in between.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(change_time)
+def _compile_change_time(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(change_time, "postgresql")
+def _compile_change_time_postgresql(element, compiler, **kw):
+    return "clock_timestamp()"
+
 challenge_tasks_association = Table(
     "challenge_tasks",
     Base.metadata,
@@ -46,6 +70,12 @@ class User(Base):
     challenges = relationship(
         "Challenge", back_populates="user", cascade="all, delete-orphan"
     )
+    progress = relationship(
+        "UserProgress", back_populates="user", uselist=False, cascade="all, delete-orphan"
+    )
+    insight = relationship(
+        "UserInsight", back_populates="user", uselist=False, cascade="all, delete-orphan"
+    )
 
 
 class Syllabus(Base):
@@ -58,7 +88,9 @@ class Syllabus(Base):
     unit = Column(String, nullable=False, default="weeks")
     generated_content = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, onupdate=func.now())
+    updated_at = Column(DateTime, default=change_time(), onupdate=change_time())
+    # Bumped on every write; the detail ETag is built from it.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="syllaby")
     kanban_board = relationship(
@@ -68,6 +100,11 @@ class Syllabus(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        Index("ix_syllaby_owner_id", "owner_id", "id"),
+        Index("ix_syllaby_owner_updated", "owner_id", "updated_at"),
+    )
+
 
 class KeyTerm(Base):
     __tablename__ = "key_terms"
@@ -93,7 +130,7 @@ class Note(Base):
     original_content = Column(Text)
     summary = Column(Text, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, onupdate=func.now())
+    updated_at = Column(DateTime, default=change_time(), onupdate=change_time())
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="notes")
 
@@ -104,25 +141,36 @@ class Note(Base):
         "Flashcard", back_populates="note", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_notes_owner_id", "owner_id", "id"),
+        Index("ix_notes_owner_updated", "owner_id", "updated_at"),
+    )
+
 
 class KanbanBoard(Base):
     __tablename__ = "kanban_boards"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     syllabus_id = Column(Integer, ForeignKey("syllaby.id"), nullable=True, unique=True)
+    updated_at = Column(DateTime, default=change_time(), onupdate=change_time())
+    # Bumped on every write to the board or to any of its columns or tasks.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     owner = relationship("User", back_populates="kanban_boards")
     columns = relationship(
         "KanbanColumn", back_populates="board", cascade="all, delete-orphan"
     )
     syllabus = relationship("Syllabus", back_populates="kanban_board")
 
+    __table_args__ = (Index("ix_kanban_boards_owner_updated", "owner_id", "updated_at"),)
+
 
 class KanbanColumn(Base):
     __tablename__ = "kanban_columns"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    board_id = Column(Integer, ForeignKey("kanban_boards.id"))
+    board_id = Column(Integer, ForeignKey("kanban_boards.id"), index=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     board = relationship("KanbanBoard", back_populates="columns")
     tasks = relationship(
         "KanbanTask",
@@ -142,8 +190,16 @@ class KanbanTask(Base):
     completed = Column(Boolean, default=False)
     position = Column(Integer, default=0, nullable=False)
     column_id = Column(Integer, ForeignKey("kanban_columns.id"))
+    updated_at = Column(DateTime, default=change_time(), onupdate=change_time())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     column = relationship("KanbanColumn", back_populates="tasks")
 
+    __table_args__ = (
+        Index("ix_kanban_tasks_column_position", "column_id", "position"),
+        Index("ix_kanban_tasks_column_due_date", "column_id", "due_date"),
+        Index("ix_kanban_tasks_column_updated", "column_id", "updated_at"),
+    )
+
 
 class QuizAttempt(Base):
     __tablename__ = "quiz_attempts"
@@ -154,6 +210,8 @@ class QuizAttempt(Base):
     timestamp = Column(DateTime, server_default=func.now())
     user = relationship("User", back_populates="quiz_attempts")
 
+    __table_args__ = (Index("ix_quiz_attempts_user_id", "user_id", "id"),)
+
 
 class Challenge(Base):
     __tablename__ = "challenges"
@@ -164,23 +222,84 @@ class Challenge(Base):
     end_date = Column(DateTime, nullable=False)
     status = Column(String, default="active")
     user_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime, default=change_time(), onupdate=change_time())
     user = relationship("User", back_populates="challenges")
     tasks = relationship("KanbanTask", secondary=challenge_tasks_association)
 
-    total_tasks = column_property(
-        select(func.count(challenge_tasks_association.c.task_id))
-        .where(challenge_tasks_association.c.challenge_id == id)
-        .correlate_except(challenge_tasks_association)
-        .scalar_subquery()
-    )
-
-    completed_tasks = column_property(
-        select(func.count(KanbanTask.id))
-        .where(
-            KanbanTask.id == challenge_tasks_association.c.task_id,
-            challenge_tasks_association.c.challenge_id == id,
-            KanbanTask.completed == True
-        )
-        .correlate_except(KanbanTask)
-        .scalar_subquery()
-    )
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_challenges_user_status", "user_id", "status", "id"),
+        Index("ix_challenges_user_updated", "user_id", "updated_at"),
+    )
+
+
+class UserProgress(Base):
+    __tablename__ = "user_progress"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_tasks = Column(Integer, nullable=False, default=0)
+    completed_tasks = Column(Integer, nullable=False, default=0)
+    quiz_attempts = Column(Integer, nullable=False, default=0)
+    quiz_score_total = Column(Integer, nullable=False, default=0)
+    active_challenges = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Bumped with every counter change and by any write that alters the
+    # dashboard lists; dashboard_lists is valid while dashboard_lists_key
+    # matches "<version>:<date>".
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    dashboard_lists = Column(Text, nullable=True)
+    dashboard_lists_key = Column(String, nullable=True)
+    user = relationship("User", back_populates="progress")
+
+
+class UserInsight(Base):
+    __tablename__ = "user_insights"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    insight_text = Column(Text, nullable=False)
+    severity = Column(String, nullable=False, default="low")
+    generated_at = Column(DateTime, nullable=False)
+    user = relationship("User", back_populates="insight")
+
+
+class PooledQuestion(Base):
+    """A pre-generated quiz or freeform question waiting to be served.
+
+    Sources are a syllabus week (source_type "syllabus", week_number set) or a
+    note (week_number 0). Questions generated from an older version of the
+    source carry a stale source_fingerprint and are no longer served.
+    """
+
+    __tablename__ = "question_pool"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source_type = Column(String, nullable=False)
+    source_id = Column(Integer, nullable=False)
+    week_number = Column(Integer, nullable=False, default=0)
+    question_type = Column(String, nullable=False)
+    difficulty = Column(String, nullable=False)
+    source_fingerprint = Column(String(64), nullable=False)
+    question = Column(Text, nullable=False)
+    payload = Column(Text, nullable=False)
+    served_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index(
+            "ix_question_pool_source",
+            "owner_id",
+            "source_type",
+            "source_id",
+            "question_type",
+            "difficulty",
+        ),
+    )
+
+
+class SyncTombstone(Base):
+    __tablename__ = "sync_tombstones"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=change_time())
+
+    __table_args__ = (Index("ix_sync_tombstones_user_deleted", "user_id", "deleted_at"),)
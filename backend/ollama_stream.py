@@ -0,0 +1,96 @@
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Streaming POSTs to Ollama that another thread can abort.
+#
+# Ollama sends nothing while it loads the model and evaluates the prompt, so a
+# call stopped in that phase would otherwise sit in a blocking read until the
+# first token or the read timeout. Each request's socket is handed to its
+# StreamStop as soon as the request is sent; StreamStop.set() shuts the socket
+# down, which ends the blocked read and makes Ollama stop generating.
+
+_current = threading.local()
+
+
+class StreamStop:
+    """Stop flag for one streaming call that also aborts its socket."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def set(self) -> None:
+        with self._lock:
+            self._event.set()
+            _shutdown(self._connection)
+
+    def attach(self, connection) -> None:
+        with self._lock:
+            self._connection = connection
+            if self._event.is_set():
+                _shutdown(connection)
+
+
+def _shutdown(connection) -> None:
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _StoppableConnectionMixin:
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        stop = getattr(_current, "stop", None)
+        if stop is not None:
+            stop.attach(self)
+
+
+class _StoppableHTTPConnection(_StoppableConnectionMixin, HTTPConnection):
+    pass
+
+
+class _StoppableHTTPSConnection(_StoppableConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _StoppableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _StoppableHTTPConnection
+
+
+class _StoppableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _StoppableHTTPSConnection
+
+
+class _StoppableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _StoppableHTTPConnectionPool,
+            "https": _StoppableHTTPSConnectionPool,
+        }
+
+
+def post_stream(url: str, stop: StreamStop, **kwargs) -> requests.Response:
+    """requests.post(url, stream=True, ...) whose socket stop.set() aborts."""
+    _current.stop = stop
+    try:
+        with requests.Session() as session:
+            adapter = _StoppableAdapter()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session.post(url, stream=True, **kwargs)
+    finally:
+        _current.stop = None
@@ -0,0 +1,53 @@
+import base64
+import models
+
+# Key-set pagination shared by the sync and async CRUD layers. A cursor is the
+# sort key of the last row on the previous page, so each page is an index range
+# scan that costs the same at any depth, unlike OFFSET.
+#
+# Lists are keyed on the primary key. created_at/timestamp are insertion-time
+# server defaults, so id order is the same order with a unique tie-breaker, and
+# it avoids comparing SQLite's mixed textual datetime formats.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+SYLLABUS_PAGE_KEY = models.Syllabus.id
+NOTE_PAGE_KEY = models.Note.id
+TASK_PAGE_KEY = models.KanbanTask.id
+QUIZ_ATTEMPT_PAGE_KEY = models.QuizAttempt.id
+CHALLENGE_PAGE_KEY = models.Challenge.id
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(value: int) -> str:
+    return base64.urlsafe_b64encode(str(value).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except ValueError as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def apply_keyset(
+    stmt, key_column, cursor: str | None, limit: int, descending: bool = False
+):
+    """Filters past the cursor, orders by the key and fetches one extra row."""
+    if cursor:
+        value = decode_cursor(cursor)
+        stmt = stmt.where(key_column < value if descending else key_column > value)
+    order = key_column.desc() if descending else key_column.asc()
+    return stmt.order_by(order).limit(limit + 1)
+
+
+def split_page(rows: list, key_column, limit: int) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], key_column.key))
@@ -0,0 +1,254 @@
+import math
+import os
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+# Token budgeting for Ollama prompts. Ollama silently drops the start of a
+# prompt that overflows num_ctx, which is usually the instructions, so prompts
+# are fitted here instead: the fixed instruction text is always kept, and the
+# variable sections are compressed and trimmed in priority order.
+#
+# Token counts are estimated from character length; there is no tokenizer for
+# the local models, and ~4 characters per token is close for English text.
+
+CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", 4))
+# Prompts are fitted to this when no context size is configured; num_ctx is
+# then left to the Ollama server, which should allow at least this much.
+DEFAULT_CONTEXT_TOKENS = 8192
+# At most this share of the context is held back for the model's answer, so a
+# large num_predict can't leave no room for the prompt.
+MAX_OUTPUT_SHARE = float(os.getenv("PROMPT_MAX_OUTPUT_SHARE", 0.5))
+# A section trimmed below this many tokens is dropped instead.
+MIN_SECTION_TOKENS = 32
+TRUNCATION_MARKER = "\n[... truncated to fit the model context ...]"
+SECTION_SEPARATOR = "\n---\n"
+
+Section = Union[str, Sequence[str]]
+
+
+def _parse_model_limits(value: str) -> Dict[str, int]:
+    """Parses OLLAMA_MODEL_CONTEXT_TOKENS, e.g. "llama3.1:8b=16384,mistral=32768"."""
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            model, tokens = item.rsplit("=", 1)
+            limits[model.strip()] = int(tokens)
+    return limits
+
+
+MODEL_CONTEXT_TOKENS = _parse_model_limits(
+    os.getenv("OLLAMA_MODEL_CONTEXT_TOKENS", "")
+)
+CONFIGURED_CONTEXT_TOKENS = os.getenv("OLLAMA_CONTEXT_TOKENS")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def configured_context_tokens(model: Optional[str] = None) -> Optional[int]:
+    """The context size set for the model, or None if none is configured."""
+    model = model or os.getenv("OLLAMA_MODEL_NAME", "")
+    if model in MODEL_CONTEXT_TOKENS:
+        return MODEL_CONTEXT_TOKENS[model]
+    # "llama3.1:8b" falls back to a limit configured for "llama3.1".
+    base_model = model.split(":", 1)[0]
+    if base_model in MODEL_CONTEXT_TOKENS:
+        return MODEL_CONTEXT_TOKENS[base_model]
+    return int(CONFIGURED_CONTEXT_TOKENS) if CONFIGURED_CONTEXT_TOKENS else None
+
+
+def context_tokens(model: Optional[str] = None) -> int:
+    configured = configured_context_tokens(model)
+    return DEFAULT_CONTEXT_TOKENS if configured is None else configured
+
+
+def output_reserve(num_predict: int, model: Optional[str] = None) -> int:
+    return min(num_predict, int(context_tokens(model) * MAX_OUTPUT_SHARE))
+
+
+def compress(text: str) -> str:
+    """Collapses runs of spaces and blank lines, which cost tokens but no meaning."""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n\s*\n\s*\n+", "\n\n", text)
+    return text.strip()
+
+
+def _words(text: str) -> set:
+    return {word for word in re.findall(r"\w+", text.lower()) if len(word) > 3}
+
+
+def rank_by_relevance(items: Sequence[str], query: str) -> List[str]:
+    """Orders content items by how many of the query's words they share."""
+    query_words = _words(query)
+    return sorted(items, key=lambda item: -len(query_words & _words(item)))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER)
+    if keep <= 0:
+        return ""
+    cut = text[:keep]
+    # Prefer to cut at a line or word boundary.
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > keep // 2:
+        cut = cut[:boundary]
+    return cut + TRUNCATION_MARKER
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Splits one paragraph into sentences, or hard-wraps it if it has none."""
+    pieces = re.split(r"(?<=[.!?])\s+", text)
+    if len(pieces) == 1:
+        width = max(int(max_tokens * CHARS_PER_TOKEN), 1)
+        return [text[start : start + width] for start in range(0, len(text), width)]
+    return split_into_chunks(" \n".join(pieces), max_tokens, separator=" \n")
+
+
+def split_into_chunks(
+    text: str, max_tokens: int, separator: str = "\n\n"
+) -> List[str]:
+    """Packs paragraphs (then sentences) into chunks of at most max_tokens."""
+    pattern = r"\n\s*\n" if separator == "\n\n" else r" \n"
+    chunks, current = [], ""
+    for part in re.split(pattern, compress(text)):
+        part = part.strip()
+        if not part:
+            continue
+        if estimate_tokens(part) > max_tokens:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split_oversized(part, max_tokens))
+            continue
+        candidate = f"{current}{separator}{part}" if current else part
+        if estimate_tokens(candidate) > max_tokens:
+            chunks.append(current)
+            candidate = part
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class PromptBudget:
+    """Tracks how much of one call's context window the prompt has used."""
+
+    def __init__(self, label: str, num_predict: int, model: Optional[str] = None):
+        self.label = label
+        self.context = context_tokens(model)
+        self.reserved = output_reserve(num_predict, model)
+        self.available = self.context - self.reserved
+        self.used = 0
+        self.trimmed: List[str] = []
+
+    @property
+    def remaining(self) -> int:
+        return max(self.available - self.used, 0)
+
+    def reserve(self, text: str) -> None:
+        """Counts text that must be sent in full, such as the instructions."""
+        self.used += estimate_tokens(text)
+
+    def fit(self, name: str, section: Section, query: Optional[str] = None) -> str:
+        """Compresses and trims a section to what is left of the budget.
+
+        A list section is a set of content items. They are ranked by relevance
+        to the query when one is given and kept whole while they fit; the first
+        one that doesn't is truncated and the rest are dropped.
+        """
+        items = [section] if isinstance(section, str) else list(section)
+        items = [compress(item) for item in items if item and item.strip()]
+        if query and len(items) > 1:
+            items = rank_by_relevance(items, query)
+
+        kept = []
+        for item in items:
+            separator_tokens = estimate_tokens(SECTION_SEPARATOR) if kept else 0
+            tokens = estimate_tokens(item) + separator_tokens
+            if tokens <= self.remaining:
+                kept.append(item)
+                self.used += tokens
+                continue
+            room = self.remaining - separator_tokens
+            if room >= MIN_SECTION_TOKENS:
+                kept.append(truncate_to_tokens(item, room))
+                self.used += room + separator_tokens
+            self.trimmed.append(name)
+            break
+        return SECTION_SEPARATOR.join(kept)
+
+    def log(self) -> None:
+        trimmed = f", trimmed: {', '.join(self.trimmed)}" if self.trimmed else ""
+        print(
+            f"Prompt budget [{self.label}]: ~{self.used}/{self.available} prompt "
+            f"tokens (context {self.context}, {self.reserved} reserved for output)"
+            f"{trimmed}"
+        )
+
+
+def build_prompt(
+    label: str,
+    render: Callable[..., str],
+    num_predict: int,
+    model: Optional[str] = None,
+    query: Optional[str] = None,
+    **sections: Section,
+) -> str:
+    """Renders a prompt whose sections are fitted to the model's context.
+
+    render(**sections) builds the prompt; whatever it adds around the sections
+    is the instructions and is always kept. Sections are fitted in keyword
+    order, so pass the question before the content it should outrank.
+    """
+    budget = PromptBudget(label, num_predict, model)
+    budget.reserve(render(**{name: "" for name in sections}))
+    fitted = {
+        name: budget.fit(name, section, query=query)
+        for name, section in sections.items()
+    }
+    budget.log()
+    return render(**fitted)
+
+
+def fit_messages(
+    label: str, messages: list, num_predict: int, model: Optional[str] = None
+) -> list:
+    """Keeps the system message and as many of the newest chat turns as fit.
+
+    The newest turn is truncated if it needs more than what the system
+    message leaves, but always gets at least half of the budget; the system
+    message is then trimmed to what remains.
+    """
+    budget = PromptBudget(label, num_predict, model)
+    system = [msg for msg in messages if msg.role == "system"]
+    turns = [msg for msg in messages if msg.role != "system"]
+
+    system_tokens = sum(estimate_tokens(msg.content) for msg in system)
+    newest_limit = max(budget.available - system_tokens, budget.available // 2)
+    newest = []
+    for msg in turns[-1:]:
+        if estimate_tokens(msg.content) > newest_limit:
+            msg = msg.model_copy(
+                update={"content": truncate_to_tokens(msg.content, newest_limit)}
+            )
+            budget.trimmed.append("newest turn")
+        budget.reserve(msg.content)
+        newest.append(msg)
+    fitted_system = [
+        msg.model_copy(update={"content": budget.fit("system", msg.content)})
+        for msg in system
+    ]
+
+    kept = []
+    for msg in reversed(turns[:-1]):
+        tokens = estimate_tokens(msg.content)
+        if tokens > budget.remaining:
+            budget.trimmed.append("history")
+            break
+        budget.used += tokens
+        kept.append(msg)
+    budget.log()
+    return fitted_system + list(reversed(kept)) + newest
@@ -0,0 +1,16 @@
+from database import SessionLocal, engine
+import crud, models
+
+
+def main():
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        rebuilt = crud.rebuild_all_user_progress(db)
+        print(f"Rebuilt progress counters for {rebuilt} users.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, computed_field, root_validator, validator, ConfigDict, EmailStr
 from datetime import datetime, date
-from typing import List, Optional, Literal
+from typing import Annotated, List, Optional, Literal, Union
 import json
 
 V2_ORM_CONFIG = ConfigDict(from_attributes=True)
@@ -24,6 +24,16 @@ class TokenData(BaseModel):
     username: str | None = None
 
 
+class AuthenticatedUser(BaseModel):
+    id: int
+    username: str
+    email: str
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_activity_date: Optional[date] = None
+    model_config = V2_ORM_CONFIG
+
+
 class SyllabusBase(BaseModel):
     title: str = Field(..., min_length=3, max_length=100)
     course_code: str | None = Field(None, max_length=20)
@@ -53,6 +63,10 @@ class Syllabus(SyllabusBase):
     model_config = V2_ORM_CONFIG
 
 
+class SyllabusCreateOutput(Syllabus):
+    partial: bool = False
+
+
 class TextProcessInput(BaseModel):
     content: str = Field(..., min_length=50)
 
@@ -85,6 +99,7 @@ class ProcessedNoteContent(BaseModel):
     summary: Optional[str] = None
     key_terms: Optional[List[str]] = None
     flashcards: Optional[List[Flashcard]] = None
+    partial: bool = False
 
 
 class NoteBase(BaseModel):
@@ -128,6 +143,7 @@ class QuizQuestion(BaseModel):
 
 class QuizOutput(BaseModel):
     quiz: List[QuizQuestion]
+    partial: bool = False
 
 
 class QuizGenerateInput(BaseModel):
@@ -172,8 +188,9 @@ class QuizResultOutput(BaseModel):
 
 
 class FreeFormQuestionGenerateInput(BaseModel):
-    syllaby_ids: Optional[List[int]] = None
-    note_ids: Optional[List[int]] = None
+    # The ids are kept with each outstanding question until it is scored.
+    syllaby_ids: Optional[List[int]] = Field(None, max_length=10)
+    note_ids: Optional[List[int]] = Field(None, max_length=20)
     difficulty: Literal["easy", "medium", "hard"] = "medium"
 
     @root_validator(pre=True)
@@ -197,6 +214,26 @@ class FreeFormAnswerOutput(BaseModel):
     feedback: str
 
 
+class FreeFormBatchAnswerInput(BaseModel):
+    answers: List[FreeFormAnswerInput] = Field(..., min_length=1, max_length=20)
+
+
+class FreeFormBatchAnswerResult(FreeFormAnswerOutput):
+    question_id: str
+
+
+class FreeFormBatchAnswerOutput(BaseModel):
+    results: List[FreeFormBatchAnswerResult]
+
+
+class QuestionPoolSource(BaseModel):
+    source_type: Literal["syllabus", "note"]
+    source_id: int
+    week_number: int = 0
+    fingerprint: str
+    content: str
+
+
 class ChatSessionStartInput(BaseModel):
     syllaby_ids: Optional[List[int]] = None
     note_ids: Optional[List[int]] = None
@@ -248,6 +285,31 @@ class KanbanTask(KanbanTaskBase):
     model_config = V2_ORM_CONFIG
 
 
+class KanbanTaskCalendarItem(BaseModel):
+    id: int
+    title: str
+    priority: Optional[str] = None
+    due_date: datetime
+    completed: bool
+    column_id: int
+    column_title: str
+    board_id: int
+    board_title: str
+    model_config = V2_ORM_CONFIG
+
+
+class KanbanTaskDayCount(BaseModel):
+    day: date
+    total: int
+    completed: int
+    model_config = V2_ORM_CONFIG
+
+
+class KanbanTaskRange(BaseModel):
+    tasks: List[KanbanTaskCalendarItem] = []
+    day_counts: Optional[List[KanbanTaskDayCount]] = None
+
+
 class KanbanTaskMove(BaseModel):
     task_id: int = Field(..., alias="taskId")
     source_column_id: int = Field(..., alias="sourceColumnId")
@@ -256,6 +318,49 @@ class KanbanTaskMove(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
+class KanbanBatchMove(BaseModel):
+    op: Literal["move"]
+    task_id: int = Field(..., alias="taskId")
+    column_id: int = Field(..., alias="destinationColumnId")
+    destination_index: int = Field(..., alias="destinationIndex")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class KanbanBatchUpdate(BaseModel):
+    op: Literal["update"]
+    task_id: int = Field(..., alias="taskId")
+    changes: KanbanTaskUpdate
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class KanbanBatchCreate(BaseModel):
+    op: Literal["create"]
+    column_id: int = Field(..., alias="columnId")
+    task: KanbanTaskCreate
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class KanbanBatchDelete(BaseModel):
+    op: Literal["delete"]
+    task_id: int = Field(..., alias="taskId")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+KanbanBatchOperation = Annotated[
+    Union[KanbanBatchMove, KanbanBatchUpdate, KanbanBatchCreate, KanbanBatchDelete],
+    Field(discriminator="op"),
+]
+
+
+class KanbanBatchInput(BaseModel):
+    operations: List[KanbanBatchOperation] = Field(..., min_items=1)
+
+
+class KanbanBatchOutput(BaseModel):
+    tasks: List[KanbanTask] = []
+    deleted_task_ids: List[int] = []
+
+
 class KanbanColumnBase(BaseModel):
     title: str
 
@@ -339,6 +444,8 @@ class ProgressDashboardData(BaseModel):
     upcoming_tasks: List[KanbanTask]
     active_challenges: List[Challenge]
     recent_quiz_scores: List[QuizAttempt]
+    total_quiz_attempts: int = 0
+    average_quiz_score: float = 0.0
     ai_insight: Optional[AIPoweredInsight] = None
 
 class User(UserBase):
@@ -375,7 +482,7 @@ class SyllabusWeek(BaseModel):
 class SyllabusDetail(SyllabusBase):
     id: int
     owner_id: int
-    generated_content: str
+    generated_content: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -405,4 +512,35 @@ class ChallengeDetail(Challenge):
 
 class ChallengeUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=3)
-    description: Optional[str] = None
\ No newline at end of file
+    description: Optional[str] = None
+
+class SyncKanbanColumn(KanbanColumnBase):
+    id: int
+    model_config = V2_ORM_CONFIG
+
+
+class SyncKanbanBoard(KanbanBoardBase):
+    id: int
+    owner_id: int
+    syllabus_id: Optional[int] = None
+    columns: List[SyncKanbanColumn] = []
+    model_config = V2_ORM_CONFIG
+
+
+class SyncDeletions(BaseModel):
+    syllaby: List[int] = []
+    notes: List[int] = []
+    kanban_boards: List[int] = []
+    kanban_tasks: List[int] = []
+    challenges: List[int] = []
+
+
+class SyncChanges(BaseModel):
+    sync_token: str
+    full: bool
+    syllaby: List[Syllabus] = []
+    notes: List[Note] = []
+    kanban_boards: List[SyncKanbanBoard] = []
+    kanban_tasks: List[KanbanTask] = []
+    challenges: List[Challenge] = []
+    deleted: SyncDeletions = SyncDeletions()
@@ -0,0 +1,15 @@
+import { useEffect, useRef } from "react";
+
+// Leaving a page does not cancel its in-flight requests, and the server only
+// stops an AI generation once the connection closes. Pass the returned
+// signal() to long AI calls so they are aborted when the page unmounts.
+export const useAbortOnUnmount = () => {
+  const controllerRef = useRef(null);
+  useEffect(() => {
+    controllerRef.current = new AbortController();
+    return () => controllerRef.current.abort();
+  }, []);
+  return () => controllerRef.current?.signal;
+};
+
+export const isAbortError = (err) => err?.code === "ERR_CANCELED";
@@ -32,4 +32,19 @@ api.interceptors.response.use(
   }
 );
 
+// Follows the X-Next-Cursor header of paginated list endpoints and returns
+// every item across all pages.
+export const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await api.get(url, {
+      params: cursor ? { ...params, cursor } : params,
+    });
+    items.push(...response.data);
+    cursor = response.headers["x-next-cursor"] || null;
+  } while (cursor);
+  return items;
+};
+
 export default api;
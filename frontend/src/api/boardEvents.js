@@ -0,0 +1,55 @@
+const BASE_URL = import.meta.env.VITE_API_BASE_URL;
+const RECONNECT_DELAY_MS = 3000;
+
+// Reads the /kanban/{boardId}/events server-sent event stream. fetch is used
+// instead of EventSource so the bearer token goes in a header, not the URL.
+// onOpen runs on every (re)connect, since diffs sent while disconnected are
+// lost and the board should be refetched. Returns an unsubscribe function.
+export const subscribeToBoardEvents = (boardId, { onOpen, onMessage }) => {
+  const controller = new AbortController();
+  let stopped = false;
+
+  const connect = async () => {
+    while (!stopped) {
+      try {
+        const token = localStorage.getItem("access_token");
+        const response = await fetch(`${BASE_URL}/kanban/${boardId}/events`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+          signal: controller.signal,
+        });
+        if (response.status === 401 || response.status === 404) return;
+        if (!response.ok) throw new Error(`Board events: ${response.status}`);
+        onOpen?.();
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const frames = buffer.split("\n\n");
+          buffer = frames.pop();
+          frames.forEach((frame) => {
+            const data = frame
+              .split("\n")
+              .filter((line) => line.startsWith("data:"))
+              .map((line) => line.slice(5).trim())
+              .join("\n");
+            if (data) onMessage(JSON.parse(data));
+          });
+        }
+      } catch (err) {
+        if (stopped) return;
+        console.warn("Board event stream interrupted:", err);
+      }
+      await new Promise((resolve) => setTimeout(resolve, RECONNECT_DELAY_MS));
+    }
+  };
+
+  connect();
+  return () => {
+    stopped = true;
+    controller.abort();
+  };
+};
@@ -1,7 +1,7 @@
 /* eslint-disable no-unused-vars */
 
 import React, { useState, useEffect } from 'react';
-import api from '../api/axiosConfig';
+import api, { fetchAllPages } from '../api/axiosConfig';
 import toast from 'react-hot-toast';
 
 const CreateChallengeModal = ({ isOpen, onClose, onChallengeCreated }) => {
@@ -19,8 +19,8 @@ const CreateChallengeModal = ({ isOpen, onClose, onChallengeCreated }) => {
         setLoading(true);
         setError('');
         try {
-          const response = await api.get('/kanban/tasks/all');
-          const uncompletedTasks = response.data.filter(task => !task.completed);
+          const tasks = await fetchAllPages('/kanban/tasks/all');
+          const uncompletedTasks = tasks.filter(task => !task.completed);
           setAllTasks(uncompletedTasks);
         } catch (err) {
           setError('Failed to load tasks. Please try again.');
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { Link } from "react-router-dom";
 import api from "../api/axiosConfig";
-import { formatDistanceToNow, isPast, isToday, isTomorrow } from "date-fns";
+import { addDays, format, formatDistanceToNow, isPast, isToday, isTomorrow } from "date-fns";
 import { FaCalendarAlt, FaExclamationTriangle, FaBell } from "react-icons/fa";
 
 const formatDueDate = (dueDate) => {
@@ -25,36 +25,22 @@ const UpcomingDeadlines = () => {
   useEffect(() => {
     const fetchDeadlines = async () => {
       try {
-        const { data: boardList } = await api.get("/kanban");
-        if (!boardList || boardList.length === 0) {
-          setLoading(false);
-          return;
-        }
+        const today = new Date();
+        const { data } = await api.get("/kanban/tasks", {
+          params: {
+            from: format(addDays(today, -30), "yyyy-MM-dd"),
+            to: format(addDays(today, 90), "yyyy-MM-dd"),
+            include_completed: false,
+          },
+        });
 
-        const boardDetailPromises = boardList.map(board =>
-          api.get(`/kanban/${board.id}`).then(res => res.data)
-        );
-
-        const fullBoards = await Promise.all(boardDetailPromises);
-
-        const allTasks = fullBoards.flatMap(board =>
-          board.columns.flatMap(column =>
-            (column.tasks || []).map(task => ({
-              ...task,
-              boardName: board.title,
-              columnName: column.title
-            }))
-          )
-        );
-
-        const upcomingTasks = allTasks
-          .filter(task =>
-            task &&
-            task.due_date &&
-            !task.completed &&
-            (task.columnName === "To Do" || task.columnName === "In Progress")
-          )
-          .sort((a, b) => new Date(a.due_date) - new Date(b.due_date))
+        const upcomingTasks = data.tasks
+          .map(task => ({
+            ...task,
+            boardName: task.board_title,
+            columnName: task.column_title
+          }))
+          .filter(task => task.columnName === "To Do" || task.columnName === "In Progress")
           .slice(0, 7);
 
         setDeadlines(upcomingTasks);
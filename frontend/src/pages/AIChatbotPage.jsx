@@ -1,6 +1,7 @@
 /* eslint-disable react-hooks/exhaustive-deps */
 import React, { useState, useEffect, useRef } from "react";
 import api from "../api/axiosConfig";
+import { useAbortOnUnmount, isAbortError } from "../api/abortOnUnmount";
 import { Link } from "react-router-dom";
 import ReactMarkdown from "react-markdown";
 import toast, { Toaster } from "react-hot-toast";
@@ -47,6 +48,7 @@ const AIChatbotPage = () => {
   
   const chatContainerRef = useRef(null);
   const textareaRef = useRef(null);
+  const requestSignal = useAbortOnUnmount();
 
   const formatErrorMessage = (err) => {
     if (err.response?.data?.detail) return err.response.data.detail;
@@ -59,10 +61,15 @@ const AIChatbotPage = () => {
     setChatHistory([]);
     setChatSessionId(null);
     try {
-      const { data } = await api.post("/ai/chat/start", {}); 
+      const { data } = await api.post(
+        "/ai/chat/start",
+        {},
+        { signal: requestSignal() }
+      );
       setChatSessionId(data.session_id);
       setChatHistory([{ role: "assistant", content: data.initial_message }]);
     } catch (err) {
+      if (isAbortError(err)) return;
       toast.error(formatErrorMessage(err));
     } finally {
       setLoadingChatStart(false);
@@ -98,14 +105,17 @@ const AIChatbotPage = () => {
     setLoadingMessage(true);
 
     try {
-      const { data } = await api.post(`/ai/chat/${chatSessionId}/message`, {
-        user_message: messageToSend,
-      });
+      const { data } = await api.post(
+        `/ai/chat/${chatSessionId}/message`,
+        { user_message: messageToSend },
+        { signal: requestSignal() }
+      );
       setChatHistory((prev) => [
         ...prev,
         { role: "assistant", content: data.assistant_message },
       ]);
     } catch (err) {
+      if (isAbortError(err)) return;
       toast.error(formatErrorMessage(err));
       setChatHistory((prev) => prev.slice(0, -1)); 
     } finally {
@@ -4,6 +4,9 @@ import format from "date-fns/format";
 import parse from "date-fns/parse";
 import startOfWeek from "date-fns/startOfWeek";
 import getDay from "date-fns/getDay";
+import addDays from "date-fns/addDays";
+import startOfMonth from "date-fns/startOfMonth";
+import endOfMonth from "date-fns/endOfMonth";
 import enUS from "date-fns/locale/en-US";
 import api from "../api/axiosConfig";
 import "react-big-calendar/lib/css/react-big-calendar.css";
@@ -17,18 +20,28 @@ const localizer = dateFnsLocalizer({
   locales,
 });
 
+// The month view also shows the tail and head of the neighbouring months.
+const monthRange = (date) => ({
+  from: addDays(startOfMonth(date), -7),
+  to: addDays(endOfMonth(date), 8),
+});
+
+const toApiDate = (date) => format(date, "yyyy-MM-dd'T'HH:mm:ss");
+
 const CalendarPage = () => {
   const [events, setEvents] = useState([]);
+  const [range, setRange] = useState(() => monthRange(new Date()));
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
 
   useEffect(() => {
     const fetchAndFormatTasks = async () => {
       try {
-        const { data: allTasks } = await api.get("/kanban/tasks/all");
+        const { data } = await api.get("/kanban/tasks", {
+          params: { from: toApiDate(range.from), to: toApiDate(range.to) },
+        });
 
-        const formattedEvents = allTasks
-          .filter((task) => task.due_date)
+        const formattedEvents = data.tasks
           .map((task) => ({
             title: task.title,
             start: new Date(task.due_date),
@@ -47,7 +60,13 @@ const CalendarPage = () => {
     };
 
     fetchAndFormatTasks();
-  }, []);
+  }, [range]);
+
+  const handleRangeChange = (visible) => {
+    // Month view reports { start, end }; week and day views report a list of days.
+    const days = Array.isArray(visible) ? visible : [visible.start, visible.end];
+    setRange({ from: days[0], to: addDays(days[days.length - 1], 1) });
+  };
 
   const eventStyleGetter = (event) => {
     const backgroundColor = event.resource.priority === "high" ? "#F87171" : "#60A5FA"; // red or blue
@@ -94,22 +113,22 @@ const CalendarPage = () => {
         )}
 
         <div className="bg-white/90 backdrop-blur-md p-4 md:p-6 rounded-2xl shadow-xl w-full">
-          {events.length === 0 ? (
-            <p className="text-center text-gray-600 py-10">
-              🎉 No tasks found! Start adding tasks to see them on your calendar.
+          {events.length === 0 && (
+            <p className="text-center text-gray-600 pb-4">
+              🎉 No tasks due in this period. Add due dates to tasks to see them on your calendar.
             </p>
-          ) : (
-            <Calendar
-              localizer={localizer}
-              events={events}
-              startAccessor="start"
-              endAccessor="end"
-              style={{ height: "80vh", width: "100%" }}
-              views={["month", "week", "day"]}
-              eventPropGetter={eventStyleGetter}
-              tooltipAccessor={(event) => `${event.title}\nPriority: ${event.resource.priority || "normal"}`}
-            />
           )}
+          <Calendar
+            localizer={localizer}
+            events={events}
+            startAccessor="start"
+            endAccessor="end"
+            style={{ height: "80vh", width: "100%" }}
+            views={["month", "week", "day"]}
+            eventPropGetter={eventStyleGetter}
+            onRangeChange={handleRangeChange}
+            tooltipAccessor={(event) => `${event.title}\nPriority: ${event.resource.priority || "normal"}`}
+          />
         </div>
       </div>
     </div>
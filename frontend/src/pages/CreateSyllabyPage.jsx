@@ -47,7 +47,13 @@ const CreateSyllabyPage = () => {
 
       const newSyllabusId = response.data?.id;
       if (newSyllabusId) {
-        toast.success("Syllaby generated successfully!");
+        if (response.data.partial) {
+          toast.success(
+            "Syllaby generated. The AI ran out of time before building its Kanban board; you can create one from the syllaby later."
+          );
+        } else {
+          toast.success("Syllaby generated successfully!");
+        }
         navigate(`/syllaby/${newSyllabusId}`);
       } else {
         setError("Syllaby created, but could not redirect. Find it in your list.");
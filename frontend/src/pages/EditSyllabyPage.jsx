@@ -20,7 +20,9 @@ const EditSyllabyPage = () => {
       setLoading(true);
       setError("");
       try {
-        const response = await api.get(`/syllaby/${syllabyId}`);
+        const response = await api.get(`/syllaby/${syllabyId}`, {
+          params: { include_raw: true },
+        });
         const data = response.data;
         setTitle(data.title);
         setCourseCode(data.course_code || "");
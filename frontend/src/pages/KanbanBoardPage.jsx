@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback } from "react";
-import { useParams, Link } from "react-router-dom";
+import { useParams, Link, useNavigate } from "react-router-dom";
 import api from "../api/axiosConfig";
+import { subscribeToBoardEvents } from "../api/boardEvents";
 import toast, { Toaster } from "react-hot-toast";
 import { DragDropContext, Droppable, Draggable } from "@hello-pangea/dnd";
 import Modal from "react-modal";
@@ -11,8 +12,47 @@ import { FaPlus } from "react-icons/fa";
 
 Modal.setAppElement("#root");
 
+// Applies one task diff from the board event stream. Diffs are idempotent, so
+// echoes of this tab's own changes leave the board as it already is.
+const applyBoardEvent = (board, event) => {
+  const { task } = event;
+  switch (event.type) {
+    case "update":
+      return {
+        ...board,
+        columns: board.columns.map((col) => ({
+          ...col,
+          tasks: col.tasks.map((t) => (t.id === task.id ? task : t)),
+        })),
+      };
+    case "create":
+    case "move": {
+      const columns = board.columns.map((col) => ({
+        ...col,
+        tasks: col.tasks.filter((t) => t.id !== task.id),
+      }));
+      const column = columns.find((col) => col.id === task.column_id);
+      if (!column) return board;
+      const index = event.type === "move" ? event.index : column.tasks.length;
+      column.tasks.splice(index, 0, task);
+      return { ...board, columns };
+    }
+    case "delete":
+      return {
+        ...board,
+        columns: board.columns.map((col) => ({
+          ...col,
+          tasks: col.tasks.filter((t) => t.id !== event.task_id),
+        })),
+      };
+    default:
+      return board;
+  }
+};
+
 const KanbanBoardPage = () => {
   const { boardId } = useParams();
+  const navigate = useNavigate();
   const [board, setBoard] = useState(null);
   const [loading, setLoading] = useState(true);
 
@@ -23,8 +63,8 @@ const KanbanBoardPage = () => {
 
   const [selectedTask, setSelectedTask] = useState(null);
 
-  const fetchBoard = useCallback(async () => {
-    setLoading(true);
+  const fetchBoard = useCallback(async (showLoading = true) => {
+    if (showLoading) setLoading(true);
     try {
       const { data } = await api.get(`/kanban/${boardId}`);
       data.columns.forEach((column) => {
@@ -43,6 +83,25 @@ const KanbanBoardPage = () => {
     fetchBoard();
   }, [fetchBoard]);
 
+  useEffect(() => {
+    return subscribeToBoardEvents(boardId, {
+      onOpen: () => fetchBoard(false),
+      onMessage: ({ events }) => {
+        events.forEach((event) => {
+          if (event.type === "resync") {
+            fetchBoard(false);
+          } else if (event.type === "board_deleted") {
+            toast.error("This board was deleted.");
+            navigate("/kanban");
+          }
+        });
+        setBoard((prevBoard) =>
+          prevBoard ? events.reduce(applyBoardEvent, prevBoard) : prevBoard
+        );
+      },
+    });
+  }, [boardId, fetchBoard, navigate]);
+
   const handleDragEnd = async (result) => {
     const { source, destination, draggableId } = result;
     if (!destination || !board) return;
@@ -74,20 +133,22 @@ const KanbanBoardPage = () => {
     setBoard({ ...board, columns });
 
     try {
-      const movePromise = api.put(`/kanban/${boardId}/move-task`, {
-        taskId: Number(draggableId),
-        sourceColumnId: Number(source.droppableId),
-        destinationColumnId: Number(destination.droppableId),
-        destinationIndex: destination.index,
-      });
-
-      const apiPromises = [movePromise];
+      const operations = [
+        {
+          op: "move",
+          taskId: Number(draggableId),
+          destinationColumnId: Number(destination.droppableId),
+          destinationIndex: destination.index,
+        },
+      ];
       if (completionChanged) {
-        apiPromises.push(
-          api.put(`/kanban/tasks/${movedTask.id}`, { completed: movedTask.completed })
-        );
+        operations.push({
+          op: "update",
+          taskId: movedTask.id,
+          changes: { completed: movedTask.completed },
+        });
       }
-      await Promise.all(apiPromises);
+      await api.post(`/kanban/${boardId}/batch`, { operations });
       toast.success("Board updated!");
     } catch {
       toast.error("Failed to save changes. Reverting.");
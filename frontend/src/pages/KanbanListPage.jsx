@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useMemo } from "react";
 import { Link, useNavigate } from "react-router-dom";
-import api from "../api/axiosConfig";
+import api, { fetchAllPages } from "../api/axiosConfig";
 import toast, { Toaster } from "react-hot-toast";
 import { FaTrash, FaPlus, FaTrophy, FaEye } from "react-icons/fa";
 import CreateBoardModal from "../components/CreateBoardModal";
@@ -95,14 +95,14 @@ const KanbanListPage = () => {
     const fetchAllData = async () => {
       setLoading(true);
       try {
-        const [boardsRes, syllabiRes, challengesRes] = await Promise.all([
+        const [boardsRes, syllabiRes, allChallenges] = await Promise.all([
           api.get("/kanban"),
           api.get("/syllaby"),
-          api.get("/challenges")
+          fetchAllPages("/challenges")
         ]);
         setBoards(boardsRes.data);
         setSyllabi(syllabiRes.data);
-        setChallenges(challengesRes.data);
+        setChallenges(allChallenges);
       } catch {
         toast.error("Failed to load your workspace data.");
       } finally {
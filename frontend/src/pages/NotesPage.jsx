@@ -44,7 +44,11 @@ const NotesPage = () => {
       setSummary(data.summary || '');
       setKeyTerms(data.key_terms || []);
       setFlashcards(data.flashcards || []);
-      toast.success('AI processing complete!', { id: toastId });
+      if (data.partial) {
+        toast.success('AI ran out of time; some results were skipped.', { id: toastId });
+      } else {
+        toast.success('AI processing complete!', { id: toastId });
+      }
     } catch (err) {
       toast.error(err.response?.data?.detail || 'Failed to process content.', { id: toastId });
     } finally {
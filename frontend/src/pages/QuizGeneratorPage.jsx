@@ -1,9 +1,11 @@
 import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import api from "../api/axiosConfig";
+import { useAbortOnUnmount, isAbortError } from "../api/abortOnUnmount";
 
 const QuizGeneratorPage = () => {
   const navigate = useNavigate(); // ✅
+  const requestSignal = useAbortOnUnmount();
   const [syllabyList, setSyllabyList] = useState([]);
   const [noteList, setNoteList] = useState([]);
   const [selectedSyllabyIds, setSelectedSyllabyIds] = useState([]);
@@ -97,10 +99,18 @@ const QuizGeneratorPage = () => {
         difficulty: difficulty,
         question_type: questionType,
       };
-      const response = await api.post("/ai/generate-quiz", quizInput);
+      const response = await api.post("/ai/generate-quiz", quizInput, {
+        signal: requestSignal(),
+      });
       setGeneratedQuiz(response.data.quiz);
       setQuizMode("review");
+      if (response.data.partial) {
+        setError(
+          `The AI ran out of time; only ${response.data.quiz.length} of ${numQuestions} questions were generated.`
+        );
+      }
     } catch (err) {
+      if (isAbortError(err)) return;
       setError(formatErrorMessage(err));
       console.error("Quiz generation error:", err.response?.data || err);
     } finally {
@@ -1,6 +1,7 @@
 /* eslint-disable no-unused-vars */
 import React, { useState, useEffect, useRef } from 'react';
 import api from '../api/axiosConfig';
+import { useAbortOnUnmount, isAbortError } from '../api/abortOnUnmount';
 import { motion, AnimatePresence } from 'framer-motion';
 import { FaBookOpen, FaPaperPlane, FaWandMagicSparkles } from 'react-icons/fa6';
 import { FaFeatherAlt,FaRedo  } from 'react-icons/fa';
@@ -63,6 +64,7 @@ const StudyAssistantPage = () => {
 
   const chatContainerRef = useRef(null);
   const textareaRef = useRef(null);
+  const requestSignal = useAbortOnUnmount();
 
   const formatErrorMessage = (err) => {
     if (err.response?.data?.detail) return err.response.data.detail;
@@ -119,10 +121,11 @@ const StudyAssistantPage = () => {
       const { data } = await api.post('/ai/chat/start', {
         syllaby_ids: selectedSyllabyIds,
         note_ids: selectedNoteIds,
-      });
+      }, { signal: requestSignal() });
       setChatSessionId(data.session_id);
       setChatHistory([{ role: 'assistant', content: data.initial_message }]);
     } catch (err) {
+      if (isAbortError(err)) return;
       toast.error(formatErrorMessage(err));
     } finally {
       setLoadingSession(false);
@@ -140,9 +143,10 @@ const StudyAssistantPage = () => {
     setLoadingMessage(true);
 
     try {
-      const { data } = await api.post(`/ai/chat/${chatSessionId}/message`, { user_message: messageToSend });
+      const { data } = await api.post(`/ai/chat/${chatSessionId}/message`, { user_message: messageToSend }, { signal: requestSignal() });
       setChatHistory(prev => [...prev, { role: 'assistant', content: data.assistant_message }]);
     } catch (err) {
+      if (isAbortError(err)) return;
       toast.error(formatErrorMessage(err));
       setChatHistory(prev => prev.slice(0, -1));
     } finally {